@@ -0,0 +1,485 @@
+"""
+Shared Generalized Pareto Distribution (GPD) estimation helpers for the
+SPOT family of streaming detectors.
+
+The SPOT/biSPOT classes used to carry verbatim copies of the Grimshaw
+maximum-likelihood machinery ; keeping a single module-level
+implementation operating on a plain peaks array means every numerical
+improvement lands once and is shared by every detector (and numba only
+has to compile one cache entry per kernel).
+"""
+from math import log
+
+import numpy as np
+
+try:
+    from numba import njit
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Fallback decorator : run the decorated function in pure Python"""
+        if args and callable(args[0]):
+            return args[0]
+
+        def wrap(func):
+            return func
+
+        return wrap
+
+
+@njit(cache=True)
+def moments(peaks, t):
+    """
+    Compute, for every candidate t, the means of log(s), 1/s and (1/s)**2
+    where s = 1 + t*peaks
+
+    The three reductions are fused into a single traversal of the peaks
+    array (one memory pass instead of three temporary-array passes), and
+    the loop is SIMD-friendly for numba
+
+    Parameters
+    ----------
+    peaks : numpy.array
+        peaks of the fitted side
+    t : numpy.array
+        candidate values of the Grimshaw variable
+
+    Returns
+    ----------
+    (numpy.array, numpy.array, numpy.array)
+        means of log(s), 1/s and (1/s)**2, one entry per candidate
+    """
+    n = peaks.size
+    m = t.size
+    lmean = np.empty(m)
+    imean = np.empty(m)
+    i2mean = np.empty(m)
+    for j in range(m):
+        tj = t[j]
+        lsum = 0.0
+        isum = 0.0
+        i2sum = 0.0
+        for i in range(n):
+            s = 1.0 + tj * peaks[i]
+            inv = 1.0 / s
+            lsum += log(s)
+            isum += inv
+            i2sum += inv * inv
+        lmean[j] = lsum / n
+        imean[j] = isum / n
+        i2mean[j] = i2sum / n
+    return lmean, imean, i2mean
+
+
+@njit(cache=True)
+def min_max_mean(Y):
+    """
+    Compute the minimum, maximum and mean of Y in a single traversal
+    (three separate NumPy reductions would read the array three times)
+
+    Parameters
+    ----------
+    Y : numpy.array
+        observations (non-empty)
+
+    Returns
+    ----------
+    (float, float, float)
+        minimum, maximum and mean of Y
+    """
+    m = Y[0]
+    M = Y[0]
+    s = 0.0
+    for i in range(Y.size):
+        v = Y[i]
+        if v < m:
+            m = v
+        if v > M:
+            M = v
+        s += v
+    return m, M, s / Y.size
+
+
+@njit(cache=True)
+def moments_weighted(centers, weights, t):
+    """
+    Weighted variant of moments for histogram-sketched peaks : empty bins
+    are skipped and every term is scaled by the bin count
+
+    Parameters
+    ----------
+    centers : numpy.array
+        histogram bin centers
+    weights : numpy.array
+        histogram bin counts
+    t : numpy.array
+        candidate values of the Grimshaw variable
+
+    Returns
+    ----------
+    (numpy.array, numpy.array, numpy.array)
+        weighted means of log(s), 1/s and (1/s)**2, one entry per candidate
+    """
+    B = centers.size
+    m = t.size
+    lmean = np.empty(m)
+    imean = np.empty(m)
+    i2mean = np.empty(m)
+    for j in range(m):
+        tj = t[j]
+        lsum = 0.0
+        isum = 0.0
+        i2sum = 0.0
+        wsum = 0.0
+        for i in range(B):
+            w = weights[i]
+            if w == 0.0:
+                continue
+            s = 1.0 + tj * centers[i]
+            inv = 1.0 / s
+            lsum += w * log(s)
+            isum += w * inv
+            i2sum += w * inv * inv
+            wsum += w
+        lmean[j] = lsum / wsum
+        imean[j] = isum / wsum
+        i2mean[j] = i2sum / wsum
+    return lmean, imean, i2mean
+
+
+if not NUMBA_AVAILABLE:
+    # without numba the fused loops above run element by element in the
+    # interpreter — far slower than the vectorized reductions they
+    # replaced ; broadcast (K, n) implementations keep the same
+    # signatures and semantics at C speed
+
+    def moments(peaks, t):  # noqa: F811
+        S = 1.0 + np.multiply.outer(t, peaks)
+        inv = 1.0 / S
+        return np.log(S).mean(axis=1), inv.mean(axis=1), (inv * inv).mean(axis=1)
+
+    def min_max_mean(Y):  # noqa: F811
+        return Y.min(), Y.max(), Y.mean()
+
+    def moments_weighted(centers, weights, t):  # noqa: F811
+        mask = weights > 0.0
+        c = centers[mask]
+        w = weights[mask]
+        wsum = w.sum()
+        S = 1.0 + np.multiply.outer(t, c)
+        inv = 1.0 / S
+        return (np.log(S) @ w) / wsum, (inv @ w) / wsum, ((inv * inv) @ w) / wsum
+
+
+def chandrupatla(f, x0, x1, xtol=1e-10, maxiter=50):
+    """
+    Vectorized Chandrupatla root finder : refine a batch of brackets at once
+
+    Parameters
+    ----------
+    f : function
+        vectorized scalar function
+    x0 : numpy.array
+        left endpoints of the brackets
+    x1 : numpy.array
+        right endpoints of the brackets (f must change sign on [x0,x1])
+    xtol : float
+        absolute tolerance on the roots
+    maxiter : int
+        maximum number of refinement iterations
+
+    Returns
+    ----------
+    numpy.array
+        one root per bracket
+    """
+    b = np.atleast_1d(np.asarray(x0, dtype=float))
+    a = np.atleast_1d(np.asarray(x1, dtype=float))
+    fb = np.atleast_1d(f(b))
+    fa = np.atleast_1d(f(a))
+    c, fc = b.copy(), fb.copy()
+    t = np.full(a.shape, 0.5)
+    for _ in range(maxiter):
+        xt = a + t * (b - a)
+        ft = np.atleast_1d(f(xt))
+        # keep (a,b) straddling the root, c is the previous a
+        same = np.sign(ft) == np.sign(fa)
+        c = np.where(same, a, b)
+        fc = np.where(same, fa, fb)
+        b = np.where(same, b, a)
+        fb = np.where(same, fb, fa)
+        a, fa = xt, ft
+        xm = np.where(np.abs(fa) < np.abs(fb), a, b)
+        tol = 2 * xtol * np.abs(xm) + 0.5 * xtol
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tlim = tol / np.abs(b - c)
+        if np.all(tlim > 0.5):
+            break
+        # inverse quadratic interpolation when well conditioned, else bisection
+        xi = (a - c) / (b - c)
+        phi = (fa - fc) / (fb - fc)
+        iqi = (phi**2 < xi) & ((1 - phi) ** 2 < 1 - xi)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tq = (
+                fa / (fb - fa) * fc / (fb - fc)
+                + (c - a) / (b - a) * fa / (fc - fa) * fb / (fc - fb)
+            )
+        t = np.where(iqi, tq, 0.5)
+        t = np.minimum(1 - tlim, np.maximum(tlim, t))
+    return np.where(np.abs(fa) < np.abs(fb), a, b)
+
+
+def roots_finder(fun, jac, bounds, npoints, method, warm=None):
+    """
+    Find possible roots of a scalar function
+
+    Parameters
+    ----------
+    fun : function
+                scalar function
+    jac : function
+        first order derivative of the function
+    bounds : tuple
+        (min,max) interval for the roots search
+    npoints : int
+        maximum number of brackets to sample
+    method : str
+        'regular' : regular sample of the search interval, 'random' : uniform (distribution) sample of the search interval
+    warm : numpy.array or None
+        roots found by a previous call ; between consecutive refits the
+        roots barely move, so injecting them into the grid yields
+        near-degenerate brackets that the refiner polishes in one or two
+        iterations instead of bisecting from scratch
+
+    Returns
+    ----------
+    numpy.array
+        possible roots of the function
+    """
+    if method == "regular":
+        X0 = np.linspace(bounds[0], bounds[1], npoints + 1)
+    elif method == "random":
+        X0 = np.sort(np.random.uniform(bounds[0], bounds[1], npoints + 1))
+
+    # the probe costs a single vectorized fun call, so sample far denser
+    # than the requested bracket count : w can cross zero twice inside
+    # one coarse cell — the typical shape just right of the -1/YM bound
+    # for bounded (negative-gamma) tails, where it plunges and re-crosses
+    # within a fraction of a percent of the interval — and a missed sign
+    # change there silently drops the dominant candidate.  Extra points
+    # packed geometrically against bounds[0] resolve that boundary layer
+    span = bounds[1] - bounds[0]
+    X0 = np.concatenate(
+        (
+            X0,
+            np.linspace(bounds[0], bounds[1], 20 * npoints + 1),
+            bounds[0] + span * np.geomspace(1e-8, 1e-2, 2 * npoints),
+        )
+    )
+
+    if warm is not None:
+        W = warm[(warm > bounds[0]) & (warm < bounds[1])]
+        if W.size:
+            X0 = np.concatenate((X0, W))
+    X0 = np.unique(X0)
+
+    # locate the sub-intervals where fun changes sign, then refine
+    # all the brackets at once (jac is not needed by the bracketed
+    # finder, the argument is kept for call-site compatibility)
+    fX0 = fun(X0)
+    idx = np.where(np.sign(fX0[:-1]) != np.sign(fX0[1:]))[0]
+    X = chandrupatla(fun, X0[idx], X0[idx + 1]) if idx.size else np.array([])
+
+    # a double crossing narrower than even the dense spacing shows up as
+    # a dip of |f| toward zero without a sign change ; keep local minima
+    # of |f| (interval endpoints included — the L-BFGS-B formulation this
+    # replaced also returned boundary minimizers, not only roots) as
+    # extra candidates.  Spurious ones are harmless since grimshaw
+    # re-scores every candidate by likelihood
+    absf = np.abs(fX0)
+    dips = np.flatnonzero(
+        np.concatenate(
+            (
+                absf[:1] < absf[1:2],
+                (absf[1:-1] < absf[:-2]) & (absf[1:-1] <= absf[2:]),
+                absf[-1:] < absf[-2:-1],
+            )
+        )
+    )
+    if dips.size:
+        X = np.concatenate((X, X0[dips]))
+    if X.size == 0:
+        return np.array([])
+
+    # adjacent brackets can converge to the same root ; rounding
+    # before np.unique collapses those near-duplicates so grimshaw does
+    # not evaluate the likelihood twice for one candidate (10 decimals :
+    # coarser rounding would flush the near-zero boundary candidates,
+    # whose tiny negative gamma is a legitimate exponential-tail fit)
+    return np.unique(np.round(X, decimals=10))
+
+
+@njit(cache=True, fastmath=True)
+def log_likelihood(Y, gamma, sigma):
+    """
+    Compute the log-likelihood for the Generalized Pareto Distribution (μ=0)
+
+    The sum is written as a plain loop so numba fuses the 1 + tau*Y,
+    log and reduction into one pass (fastmath allows the vectorized
+    log emission) instead of materializing an intermediate array
+
+    Parameters
+    ----------
+    Y : numpy.array
+                observations
+    gamma : float
+        GPD index parameter
+    sigma : float
+        GPD scale parameter (>0)
+
+    Returns
+    ----------
+    float
+        log-likelihood of the sample Y to be drawn from a GPD(γ,σ,μ=0)
+    """
+    n = Y.size
+    if gamma != 0:
+        tau = gamma / sigma
+        lsum = 0.0
+        for i in range(n):
+            lsum += log(1.0 + tau * Y[i])
+        L = -n * log(sigma) - (1 + (1 / gamma)) * lsum
+    else:
+        L = n * (1 + log(Y.mean()))
+    return L
+
+
+def grimshaw(peaks, epsilon=1e-8, n_points=10, weights=None, warm=None):
+    """
+    Compute the GPD parameters estimation with the Grimshaw's trick
+
+    Parameters
+    ----------
+    peaks : numpy.array
+        peaks of the fitted side ; when `weights` is given these are
+        histogram bin centers instead of raw excesses
+    epsilon : float
+                numerical parameter to perform (default : 1e-8)
+    n_points : int
+        maximum number of candidates for maximum likelihood (default : 10)
+    weights : numpy.array or None
+        histogram bin counts matching `peaks` (None for exact peaks)
+    warm : numpy.array or None
+        candidate zeros from a previous estimation, used to warm-start
+        the root search (see roots_finder)
+
+    Returns
+    ----------
+    gamma_best,sigma_best,ll_best,zeros
+        gamma estimates, sigma estimates, corresponding log-likelihood
+        and the candidate zeros (to warm-start the next call)
+    """
+
+    def w(Y, t):
+        # moments evaluates every candidate in one pass over Y and
+        # returns the log/reciprocal means shared by u and v
+        t = np.atleast_1d(np.asarray(t, dtype=np.float64))
+        if weights is None:
+            lmean, imean, _ = moments(Y, t)
+        else:
+            lmean, imean, _ = moments_weighted(Y, weights, t)
+        us = 1 + lmean
+        vs = imean
+        return us * vs - 1
+
+    def jac_w(Y, t):
+        t = np.atleast_1d(np.asarray(t, dtype=np.float64))
+        if weights is None:
+            lmean, imean, i2mean = moments(Y, t)
+        else:
+            lmean, imean, i2mean = moments_weighted(Y, weights, t)
+        us = 1 + lmean
+        vs = imean
+        jac_us = (1 / t) * (1 - vs)
+        jac_vs = (1 / t) * (-vs + i2mean)
+        return us * jac_vs + vs * jac_us
+
+    if weights is None:
+        act = peaks
+        n = peaks.size
+        # one fused pass yields the three statistics defining the brackets
+        Ym, YM, Ymean = min_max_mean(peaks)
+    else:
+        # bounds and means come from the occupied bins only ; empty bins
+        # outside the observed range must not widen the root brackets
+        act = peaks[weights > 0]
+        wact = weights[weights > 0]
+        n = wact.sum()
+        Ymean = (wact * act).sum() / n
+        Ym = act.min()
+        YM = act.max()
+
+    a = -1 / YM
+    if abs(a) < 2 * epsilon:
+        epsilon = abs(a) / n_points
+
+    a = a + epsilon
+    b = 2 * (Ymean - Ym) / (Ymean * Ym)
+    c = 2 * (Ymean - Ym) / (Ym**2)
+
+    # We look for possible roots
+    left_zeros = roots_finder(
+        lambda t: w(peaks, t),
+        lambda t: jac_w(peaks, t),
+        (a + epsilon, -epsilon),
+        n_points,
+        "regular",
+        warm=warm,
+    )
+
+    right_zeros = roots_finder(
+        lambda t: w(peaks, t),
+        lambda t: jac_w(peaks, t),
+        (b, c),
+        n_points,
+        "regular",
+        warm=warm,
+    )
+
+    # all the possible roots
+    zeros = np.concatenate((left_zeros, right_zeros))
+
+    # 0 is always a solution so we initialize with it
+    gamma_best = 0
+    sigma_best = Ymean
+    if weights is None:
+        ll_best = log_likelihood(act, 0.0, sigma_best)
+    else:
+        # weighted counterpart of the kernel's gamma == 0 branch
+        ll_best = n * (1 + log(Ymean))
+
+    # we look for better candidates : all the zeros are scored in one
+    # (K, Nt) broadcast, and since gamma/sigma = z the log-likelihood
+    # reuses the log(1 + z*Y) pass that yields gamma
+    if zeros.size:
+        logs = np.log(1 + np.multiply.outer(zeros, act))
+        if weights is None:
+            lsums = logs.sum(axis=1)
+        else:
+            lsums = logs @ wact
+        gammas = lsums / n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sigmas = gammas / zeros
+            LL = -n * np.log(sigmas) - (1 + 1 / gammas) * lsums
+        # gamma = 0 candidates score exactly like the baseline above
+        LL = np.where(gammas == 0, -np.inf, LL)
+        k = LL.argmax()
+        if LL[k] > ll_best:
+            gamma_best = gammas[k]
+            sigma_best = sigmas[k]
+            ll_best = LL[k]
+
+    return gamma_best, sigma_best, ll_best, zeros
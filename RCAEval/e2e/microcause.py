@@ -1,21 +1,22 @@
 # take from https://github.com/PanYicheng/dycause_rca/tree/main
 # with update
+import hashlib
+from collections import defaultdict
 from math import floor, log
 
 import matplotlib.pyplot as plt
 import networkx as nx
 import numpy as np
 import pandas as pd
-import pingouin as pg
+from joblib import Parallel, delayed
 import tigramite.data_processing as pp
 import tqdm
 from causallearn.search.ConstraintBased.PC import pc
-from pingouin import partial_corr
-from scipy.optimize import minimize
 from tigramite.independence_tests.parcorr import ParCorr
 from tigramite.pcmci import PCMCI
 
 from RCAEval.classes.graph import Graph, MemoryGraph, Node
+from RCAEval.e2e._gpd import NUMBA_AVAILABLE, grimshaw, njit
 from RCAEval.graph_construction.pc import pc_default
 from RCAEval.graph_construction.pcmci import pcmci
 from RCAEval.graph_heads import finalize_directed_adj
@@ -26,6 +27,115 @@ deep_saffron = "#FF9933"
 air_force_blue = "#5D8AA8"
 
 
+def _as_ndarray(x):
+    """
+    Convert a stream input (list, numpy.array or pandas.Series) to a
+    numpy.array
+
+    Parameters
+    ----------
+    x : list, numpy.array or pandas.Series
+        data to convert
+
+    Returns
+    ----------
+    numpy.array
+        the data as an ndarray (no copy when already an ndarray)
+    """
+    # exact-type check first : it is the hot case and skips the MRO walk
+    if type(x) is np.ndarray or isinstance(x, np.ndarray):
+        return x
+    if isinstance(x, pd.Series):
+        return x.values
+    if isinstance(x, list):
+        return np.asarray(x)
+    raise TypeError("This data format (%s) is not supported" % type(x))
+
+
+@njit(cache=True, nogil=True)
+def _advance(data, init_threshold, extreme_quantile, start, th_out):
+    """
+    Scan the stream from `start` in a tight compiled loop, recording the
+    (constant) threshold, until a sample exceeds the initial threshold or
+    the extreme quantile
+
+    Returns the index of that sample, or data.size if the stream ends
+    """
+    i = start
+    while i < data.size and data[i] <= extreme_quantile and data[i] <= init_threshold:
+        th_out[i] = extreme_quantile
+        i += 1
+    return i
+
+
+@njit(cache=True, nogil=True)
+def _advance_bi(data, init_up, init_down, eq_up, eq_down, start, thup_out, thdown_out):
+    """
+    Two-sided variant of _advance : scan until a sample leaves the
+    [init_down, init_up] band or crosses one of the extreme quantiles
+    """
+    i = start
+    while i < data.size:
+        x = data[i]
+        if x > eq_up or x > init_up or x < eq_down or x < init_down:
+            break
+        thup_out[i] = eq_up
+        thdown_out[i] = eq_down
+        i += 1
+    return i
+
+
+@njit(cache=True, nogil=True)
+def _advance_drift(data, W, head, Wsum, init_threshold, extreme_quantile, start, th_out):
+    """
+    Drift variant of _advance : scan while the samples stay below both
+    thresholds relative to the moving average, updating the normal
+    window (ring buffer and running sum) in place
+
+    Returns the index of the first model-updating sample (or data.size)
+    together with the advanced window state
+
+    The moving average makes every step depend on the previous one, so
+    unlike _advance there is no vectorized fallback : without numba this
+    runs as the same per-sample loop the caller used to inline
+    """
+    depth = W.size
+    i = start
+    while i < data.size:
+        Mi = Wsum / depth
+        if data[i] - Mi > extreme_quantile or data[i] - Mi > init_threshold:
+            break
+        th_out[i] = extreme_quantile + Mi
+        Wsum += data[i] - W[head]
+        W[head] = data[i]
+        head = (head + 1) % depth
+        i += 1
+    return i, head, Wsum
+
+
+if not NUMBA_AVAILABLE:
+    # without numba the scanners above run sample by sample in the
+    # interpreter ; one vectorized comparison plus argmax over the
+    # remaining stream finds the next model-updating sample with the
+    # same semantics, so the quiet region is still skipped in C
+
+    def _advance(data, init_threshold, extreme_quantile, start, th_out):  # noqa: F811
+        hits = data[start:] > min(extreme_quantile, init_threshold)
+        k = np.argmax(hits)
+        j = start + k if hits.size and hits[k] else data.size
+        th_out[start:j] = extreme_quantile
+        return j
+
+    def _advance_bi(data, init_up, init_down, eq_up, eq_down, start, thup_out, thdown_out):  # noqa: F811
+        tail = data[start:]
+        hits = (tail > min(eq_up, init_up)) | (tail < max(eq_down, init_down))
+        k = np.argmax(hits)
+        j = start + k if hits.size and hits[k] else data.size
+        thup_out[start:j] = eq_up
+        thdown_out[start:j] = eq_down
+        return j
+
+
 """
 ================================= MAIN CLASS ==================================
 """
@@ -60,9 +170,18 @@ class SPOT:
 
     Nt : int
         number of observed peaks
+
+    refit_every : int
+        number of new peaks to accumulate before re-estimating the GPD
+        parameters (the quantile itself is refreshed on every peak)
+
+    max_peaks : int or None
+        if set, the exact peaks array is collapsed into a histogram of
+        max_peaks bins once it grows past that size, bounding both the
+        memory and the Grimshaw cost on endless streams
     """
 
-    def __init__(self, q=1e-4):
+    def __init__(self, q=1e-4, refit_every=16, max_peaks=None, dtype=np.float64):
         """
         Constructor
 
@@ -71,18 +190,40 @@ class SPOT:
             q
                     Detection level (risk)
 
+            refit_every
+                    number of new peaks between two Grimshaw re-estimations
+
+            max_peaks
+                    bound on the stored peaks (None : keep them all)
+
+            dtype
+                    floating dtype of the stored stream and peaks
+                    (default : np.float64 ; np.float32 halves the memory
+                    traffic when the application tolerates it)
+
             Returns
             ----------
         SPOT object
         """
         self.proba = q
+        self.dtype = np.dtype(dtype)
         self.extreme_quantile = None
         self.data = None
         self.init_data = None
         self.init_threshold = None
         self.peaks = None
+        self._peaks_buf = None
         self.n = 0
         self.Nt = 0
+        self.gamma = None
+        self.sigma = None
+        self.refit_every = refit_every
+        self._last_refit_Nt = 0
+        self.max_peaks = max_peaks
+        self._hist_centers = None
+        self._hist_counts = None
+        self._hist_width = None
+        self._last_zeros = None
 
     def __str__(self):
         s = ""
@@ -112,6 +253,54 @@ class SPOT:
                 s += "Algorithm run : No\n"
         return s
 
+    def _set_peaks(self, peaks):
+        """
+        Store the initial peaks in a preallocated buffer (see _add_peak)
+        """
+        self._peaks_buf = np.empty(max(1024, 2 * peaks.size), dtype=self.dtype)
+        self._peaks_buf[: peaks.size] = peaks
+        self.Nt = peaks.size
+        self.peaks = self._peaks_buf[: self.Nt]
+        if self.max_peaks is not None and self.Nt > self.max_peaks:
+            self._to_sketch()
+
+    def _to_sketch(self):
+        """
+        Collapse the exact peaks into a fixed histogram of max_peaks bins
+        covering [0, 2*max(peaks)] ; later peaks update a bin count in
+        O(1) and Grimshaw runs on the (centers, counts) summary, so the
+        detector uses bounded memory however long the stream is
+        """
+        B = self.max_peaks
+        edges = np.linspace(0.0, 2 * self.peaks.max(), B + 1)
+        counts, _ = np.histogram(self.peaks, bins=edges)
+        self._hist_counts = counts.astype(np.float64)
+        self._hist_centers = 0.5 * (edges[:-1] + edges[1:])
+        self._hist_width = edges[1] - edges[0]
+        self.peaks = None
+        self._peaks_buf = None
+
+    def _add_peak(self, value):
+        """
+        Append a peak in amortized O(1) time : the buffer is grown
+        geometrically instead of reallocating on every np.append (or a
+        single bin count is bumped once the histogram sketch is active)
+        """
+        if self._hist_counts is None and self.max_peaks is not None and self.Nt >= self.max_peaks:
+            self._to_sketch()
+        if self._hist_counts is not None:
+            b = int(value / self._hist_width)
+            if b >= self.max_peaks:
+                b = self.max_peaks - 1  # clamp outliers into the top bin
+            self._hist_counts[b] += 1
+            self.Nt += 1
+            return
+        if self.Nt == self._peaks_buf.size:
+            self._peaks_buf = np.resize(self._peaks_buf, 2 * self._peaks_buf.size)
+        self._peaks_buf[self.Nt] = value
+        self.Nt += 1
+        self.peaks = self._peaks_buf[: self.Nt]
+
     def fit(self, init_data, data):
         """
         Import data to SPOT object
@@ -125,32 +314,29 @@ class SPOT:
                     data for the run (list, np.array or pd.series)
 
         """
-        if isinstance(data, list):
-            self.data = np.array(data)
-        elif isinstance(data, np.ndarray):
-            self.data = data
-        elif isinstance(data, pd.Series):
-            self.data = data.values
-        else:
-            print("This data format (%s) is not supported" % type(data))
-            return
-
-        if isinstance(init_data, list):
-            self.init_data = np.array(init_data)
-        elif isinstance(init_data, np.ndarray):
-            self.init_data = init_data
-        elif isinstance(init_data, pd.Series):
-            self.init_data = init_data.values
-        elif isinstance(init_data, int):
-            self.init_data = self.data[:init_data]
-            self.data = self.data[init_data:]
-        elif isinstance(init_data, float) & (init_data < 1) & (init_data > 0):
-            r = int(init_data * data.size)
-            self.init_data = self.data[:r]
-            self.data = self.data[r:]
-        else:
-            print("The initial data cannot be set")
+        try:
+            self.data = _as_ndarray(data)
+        except TypeError as error:
+            print(error)
             return
+        if self.data.dtype != self.dtype:
+            self.data = self.data.astype(self.dtype)
+
+        try:
+            self.init_data = _as_ndarray(init_data)
+        except TypeError:
+            if isinstance(init_data, int):
+                self.init_data = self.data[:init_data]
+                self.data = self.data[init_data:]
+            elif isinstance(init_data, float) & (init_data < 1) & (init_data > 0):
+                r = int(init_data * data.size)
+                self.init_data = self.data[:r]
+                self.data = self.data[r:]
+            else:
+                print("The initial data cannot be set")
+                return
+        if self.init_data.dtype != self.dtype:
+            self.init_data = self.init_data.astype(self.dtype)
 
     def add(self, data):
         """
@@ -161,16 +347,14 @@ class SPOT:
             data : list, numpy.array, pandas.Series
                     data to append
         """
-        if isinstance(data, list):
-            data = np.array(data)
-        elif isinstance(data, np.ndarray):
-            data = data
-        elif isinstance(data, pd.Series):
-            data = data.values
-        else:
-            print("This data format (%s) is not supported" % type(data))
+        try:
+            data = _as_ndarray(data)
+        except TypeError as error:
+            print(error)
             return
 
+        if data.dtype != self.dtype:
+            data = data.astype(self.dtype)
         self.data = np.append(self.data, data)
         return
 
@@ -189,12 +373,14 @@ class SPOT:
 
         n_init = self.init_data.size
 
-        S = np.sort(self.init_data)  # we sort X to get the empirical quantile
-        self.init_threshold = S[int(level * n_init)]  # t is fixed for the whole algorithm
+        # the empirical quantile is a single order statistic : selection via
+        # np.partition is O(n) where a full sort would be O(n log n)
+        k = int(level * n_init)
+        self.init_threshold = np.partition(self.init_data, k)[k]  # t is fixed for the whole algorithm
 
         # initial peaks
-        self.peaks = self.init_data[self.init_data > self.init_threshold] - self.init_threshold
-        self.Nt = self.peaks.size
+        mask = self.init_data > self.init_threshold
+        self._set_peaks(np.compress(mask, self.init_data) - self.init_threshold)
         self.n = n_init
 
         if verbose:
@@ -203,6 +389,9 @@ class SPOT:
             print("Grimshaw maximum log-likelihood estimation ... ", end="")
 
         g, s, l = self._grimshaw()
+        self.gamma = g
+        self.sigma = s
+        self._last_refit_Nt = self.Nt
         self.extreme_quantile = self._quantile(g, s)
 
         if verbose:
@@ -214,164 +403,36 @@ class SPOT:
 
         return
 
-    def _rootsFinder(fun, jac, bounds, npoints, method):
-        """
-        Find possible roots of a scalar function
-
-        Parameters
-        ----------
-        fun : function
-                    scalar function
-        jac : function
-            first order derivative of the function
-        bounds : tuple
-            (min,max) interval for the roots search
-        npoints : int
-            maximum number of roots to output
-        method : str
-            'regular' : regular sample of the search interval, 'random' : uniform (distribution) sample of the search interval
-
-        Returns
-        ----------
-        numpy.array
-            possible roots of the function
-        """
-        if method == "regular":
-            step = (bounds[1] - bounds[0]) / (npoints + 1)
-            X0 = np.arange(bounds[0] + step, bounds[1], step)
-        elif method == "random":
-            X0 = np.random.uniform(bounds[0], bounds[1], npoints)
-
-        def objFun(X, f, jac):
-            g = 0
-            j = np.zeros(X.shape)
-            i = 0
-            for x in X:
-                fx = f(x)
-                g = g + fx**2
-                j[i] = 2 * fx * jac(x)
-                i = i + 1
-            return g, j
-
-        opt = minimize(
-            lambda X: objFun(X, fun, jac),
-            X0,
-            method="L-BFGS-B",
-            jac=True,
-            bounds=[bounds] * len(X0),
-        )
-
-        X = opt.x
-        np.round(X, decimals=5)
-        return np.unique(X)
-
-    def _log_likelihood(Y, gamma, sigma):
+    def _refit(self):
         """
-        Compute the log-likelihood for the Generalized Pareto Distribution (μ=0)
-
-        Parameters
-        ----------
-        Y : numpy.array
-                    observations
-        gamma : float
-            GPD index parameter
-        sigma : float
-            GPD scale parameter (>0)
-
-        Returns
-        ----------
-        float
-            log-likelihood of the sample Y to be drawn from a GPD(γ,σ,μ=0)
+        Re-estimate the GPD parameters if enough new peaks have been
+        observed since the last fit ; the cached estimates are reused
+        otherwise since one extra peak barely moves them
         """
-        n = Y.size
-        if gamma != 0:
-            tau = gamma / sigma
-            L = -n * log(sigma) - (1 + (1 / gamma)) * (np.log(1 + tau * Y)).sum()
-        else:
-            L = n * (1 + log(Y.mean()))
-        return L
+        if self.Nt - self._last_refit_Nt >= self.refit_every:
+            self.gamma, self.sigma, _ = self._grimshaw()
+            self._last_refit_Nt = self.Nt
+        self.extreme_quantile = self._quantile(self.gamma, self.sigma)
 
     def _grimshaw(self, epsilon=1e-8, n_points=10):
         """
-        Compute the GPD parameters estimation with the Grimshaw's trick
-
-        Parameters
-        ----------
-        epsilon : float
-                    numerical parameter to perform (default : 1e-8)
-        n_points : int
-            maximum number of candidates for maximum likelihood (default : 10)
-
-        Returns
-        ----------
-        gamma_best,sigma_best,ll_best
-            gamma estimates, sigma estimates and corresponding log-likelihood
-        """
-
-        def u(s):
-            return 1 + np.log(s).mean()
-
-        def v(s):
-            return np.mean(1 / s)
-
-        def w(Y, t):
-            s = 1 + t * Y
-            us = u(s)
-            vs = v(s)
-            return us * vs - 1
-
-        def jac_w(Y, t):
-            s = 1 + t * Y
-            us = u(s)
-            vs = v(s)
-            jac_us = (1 / t) * (1 - vs)
-            jac_vs = (1 / t) * (-vs + np.mean(1 / s**2))
-            return us * jac_vs + vs * jac_us
-
-        Ym = self.peaks.min()
-        YM = self.peaks.max()
-        Ymean = self.peaks.mean()
-
-        a = -1 / YM
-        if abs(a) < 2 * epsilon:
-            epsilon = abs(a) / n_points
-
-        a = a + epsilon
-        b = 2 * (Ymean - Ym) / (Ymean * Ym)
-        c = 2 * (Ymean - Ym) / (Ym**2)
-
-        # We look for possible roots
-        left_zeros = SPOT._rootsFinder(
-            lambda t: w(self.peaks, t),
-            lambda t: jac_w(self.peaks, t),
-            (a + epsilon, -epsilon),
-            n_points,
-            "regular",
-        )
-
-        right_zeros = SPOT._rootsFinder(
-            lambda t: w(self.peaks, t), lambda t: jac_w(self.peaks, t), (b, c), n_points, "regular"
-        )
-
-        # all the possible roots
-        zeros = np.concatenate((left_zeros, right_zeros))
-
-        # 0 is always a solution so we initialize with it
-        gamma_best = 0
-        sigma_best = Ymean
-        ll_best = SPOT._log_likelihood(self.peaks, gamma_best, sigma_best)
-
-        # we look for better candidates
-        for z in zeros:
-            gamma = u(1 + z * self.peaks) - 1
-            sigma = gamma / z
-            ll = SPOT._log_likelihood(self.peaks, gamma, sigma)
-            if ll > ll_best:
-                gamma_best = gamma
-                sigma_best = sigma
-                ll_best = ll
-
-        return gamma_best, sigma_best, ll_best
+        Estimate the GPD parameters from the current peaks, or from the
+        histogram sketch once it is active (see _gpd.grimshaw) ; the
+        candidate zeros are cached to warm-start the next estimation
+        """
+        if self._hist_counts is not None:
+            g, s, ll, self._last_zeros = grimshaw(
+                self._hist_centers,
+                epsilon,
+                n_points,
+                weights=self._hist_counts,
+                warm=self._last_zeros,
+            )
+        else:
+            g, s, ll, self._last_zeros = grimshaw(
+                self.peaks, epsilon, n_points, warm=self._last_zeros
+            )
+        return g, s, ll
 
     def _quantile(self, gamma, sigma):
         """
@@ -391,11 +452,13 @@ class SPOT:
         """
         r = self.n * self.proba / self.Nt
         if gamma != 0:
-            return self.init_threshold + (sigma / gamma) * (pow(r, -gamma) - 1)
+            # expm1 keeps precision when gamma*log(r) is small, where
+            # pow(r, -gamma) - 1 cancels catastrophically
+            return self.init_threshold + (sigma / gamma) * np.expm1(-gamma * log(r))
         else:
             return self.init_threshold - sigma * log(r)
 
-    def run(self, with_alarm=True):
+    def run(self, with_alarm=True, progress=True):
         """
         Run SPOT on the stream
 
@@ -405,6 +468,10 @@ class SPOT:
 		    (default = True) If False, SPOT will adapt the threshold assuming \
             there is no abnormal values
 
+        progress : bool
+            (default = True) If False, the tqdm progress bar is disabled \
+            (its per-update bookkeeping is measurable on very long streams)
+
 
         Returns
         ----------
@@ -422,42 +489,65 @@ class SPOT:
             )
             return {}
 
-        # list of the thresholds
-        th = []
-        alarm = []
-        # Loop over the stream
-        for i in tqdm.tqdm(range(self.data.size), ascii=True):
+        n_stream = self.data.size
+        # record of the thresholds and of the alarm indexes
+        th = np.empty(n_stream, dtype=np.float64)
+        alarm = np.empty(n_stream, dtype=np.int64)
+        n_alarm = 0
+        # Loop over the stream : quiet stretches (below the initial
+        # threshold) are skipped in one compiled _advance call, the Python
+        # level only handles the samples that update the model
+        # locals for the loop : LOAD_FAST instead of LOAD_ATTR per sample,
+        # and the bar only redraws every ~0.1% of the stream
+        data = self.data
+        init_threshold = self.init_threshold
+        pbar = tqdm.tqdm(
+            total=n_stream,
+            ascii=True,
+            disable=not progress,
+            mininterval=0.5,
+            miniters=max(1, n_stream // 1000),
+        )
+        i = 0
+        while i < n_stream:
+            j = _advance(data, init_threshold, self.extreme_quantile, i, th)
+            self.n += j - i
+            pbar.update(j - i)
+            if j == n_stream:
+                break
+            i = j
+
             # If the observed value exceeds the current threshold (alarm case)
-            if self.data[i] > self.extreme_quantile:
-                # if we want to alarm, we put it in the alarm list
+            if data[i] > self.extreme_quantile:
+                # if we want to alarm, we put it in the alarm record
                 if with_alarm:
-                    alarm.append(i)
+                    alarm[n_alarm] = i
+                    n_alarm += 1
                 # otherwise we add it in the peaks
                 else:
-                    self.peaks = np.append(self.peaks, self.data[i] - self.init_threshold)
-                    self.Nt += 1
+                    self._add_peak(data[i] - init_threshold)
                     self.n += 1
                     # and we update the thresholds
 
-                    g, s, l = self._grimshaw()
-                    self.extreme_quantile = self._quantile(g, s)
+                    self._refit()
 
             # case where the value exceeds the initial threshold but not the alarm ones
-            elif self.data[i] > self.init_threshold:
+            elif data[i] > init_threshold:
                 # we add it in the peaks
-                self.peaks = np.append(self.peaks, self.data[i] - self.init_threshold)
-                self.Nt += 1
+                self._add_peak(data[i] - init_threshold)
                 self.n += 1
                 # and we update the thresholds
 
-                g, s, l = self._grimshaw()
-                self.extreme_quantile = self._quantile(g, s)
+                self._refit()
             else:
                 self.n += 1
 
-            th.append(self.extreme_quantile)  # thresholds record
+            th[i] = self.extreme_quantile  # thresholds record
+            pbar.update(1)
+            i += 1
+        pbar.close()
 
-        return {"thresholds": th, "alarms": alarm}
+        return {"thresholds": th, "alarms": alarm[:n_alarm]}
 
     def plot(self, run_results, with_alarm=True):
         """
@@ -512,8 +602,11 @@ class biSPOT:
     proba : float
         Detection level (risk), chosen by the user
 
-    extreme_quantile : float
-        current threshold (bound between normal and abnormal events)
+    eq_up, eq_down : float
+        current thresholds (bounds between normal and abnormal events) ;
+        the up/down state is held in plain attribute pairs rather than
+        dicts keyed "up"/"down" so the per-sample loop pays attribute
+        lookups instead of string hashing
 
     data : numpy.array
         stream
@@ -521,20 +614,20 @@ class biSPOT:
     init_data : numpy.array
         initial batch of observations (for the calibration/initialization step)
 
-    init_threshold : float
-        initial threshold computed during the calibration step
+    thr_up, thr_down : float
+        initial thresholds computed during the calibration step
 
-    peaks : numpy.array
-        array of peaks (excesses above the initial threshold)
+    peaks_up, peaks_down : numpy.array
+        arrays of peaks (excesses beyond the initial thresholds)
 
     n : int
         number of observed values
 
-    Nt : int
-        number of observed peaks
+    Nt_up, Nt_down : int
+        number of observed peaks per side
     """
 
-    def __init__(self, q=1e-4):
+    def __init__(self, q=1e-4, refit_every=16, dtype=np.float64):
         """
         Constructor
 
@@ -543,22 +636,43 @@ class biSPOT:
             q
                     Detection level (risk)
 
+            refit_every
+                    number of new peaks (per side) between two Grimshaw
+                    re-estimations
+
+            dtype
+                    floating dtype of the stored stream and peaks
+                    (default : np.float64 ; np.float32 halves the memory
+                    traffic when the application tolerates it)
+
             Returns
             ----------
         biSPOT object
         """
         self.proba = q
+        self.dtype = np.dtype(dtype)
         self.data = None
         self.init_data = None
         self.n = 0
-        nonedict = {"up": None, "down": None}
-
-        self.extreme_quantile = dict.copy(nonedict)
-        self.init_threshold = dict.copy(nonedict)
-        self.peaks = dict.copy(nonedict)
-        self.gamma = dict.copy(nonedict)
-        self.sigma = dict.copy(nonedict)
-        self.Nt = {"up": 0, "down": 0}
+        self.refit_every = refit_every
+        self.eq_up = None
+        self.eq_down = None
+        self.thr_up = None
+        self.thr_down = None
+        self.peaks_up = None
+        self.peaks_down = None
+        self._peaks_buf_up = None
+        self._peaks_buf_down = None
+        self.gamma_up = None
+        self.gamma_down = None
+        self.sigma_up = None
+        self.sigma_down = None
+        self.Nt_up = 0
+        self.Nt_down = 0
+        self._last_refit_up = 0
+        self._last_refit_down = 0
+        self._last_zeros_up = None
+        self._last_zeros_down = None
 
     def __str__(self):
         s = ""
@@ -576,7 +690,7 @@ class biSPOT:
             s += "Algorithm initialized : No\n"
         else:
             s += "Algorithm initialized : Yes\n"
-            s += "\t initial threshold : %s\n" % self.init_threshold
+            s += "\t initial threshold : %s\n" % {"up": self.thr_up, "down": self.thr_down}
 
             r = self.n - self.init_data.size
             if r > 0:
@@ -587,12 +701,51 @@ class biSPOT:
                     100 * len(self.alarm) / self.n,
                 )
             else:
-                s += "\t number of peaks  : %s\n" % self.Nt
-                s += "\t upper extreme quantile : %s\n" % self.extreme_quantile["up"]
-                s += "\t lower extreme quantile : %s\n" % self.extreme_quantile["down"]
+                s += "\t number of peaks  : %s\n" % {"up": self.Nt_up, "down": self.Nt_down}
+                s += "\t upper extreme quantile : %s\n" % self.eq_up
+                s += "\t lower extreme quantile : %s\n" % self.eq_down
                 s += "Algorithm run : No\n"
         return s
 
+    def _set_peaks_up(self, peaks):
+        """
+        Store the initial upper peaks in a preallocated buffer (see _add_peak_up)
+        """
+        self._peaks_buf_up = np.empty(max(1024, 2 * peaks.size), dtype=self.dtype)
+        self._peaks_buf_up[: peaks.size] = peaks
+        self.Nt_up = peaks.size
+        self.peaks_up = self._peaks_buf_up[: peaks.size]
+
+    def _set_peaks_down(self, peaks):
+        """
+        Store the initial lower peaks in a preallocated buffer (see _add_peak_down)
+        """
+        self._peaks_buf_down = np.empty(max(1024, 2 * peaks.size), dtype=self.dtype)
+        self._peaks_buf_down[: peaks.size] = peaks
+        self.Nt_down = peaks.size
+        self.peaks_down = self._peaks_buf_down[: peaks.size]
+
+    def _add_peak_up(self, value):
+        """
+        Append an upper peak in amortized O(1) time : the buffer is grown
+        geometrically instead of reallocating on every np.append
+        """
+        if self.Nt_up == self._peaks_buf_up.size:
+            self._peaks_buf_up = np.resize(self._peaks_buf_up, 2 * self._peaks_buf_up.size)
+        self._peaks_buf_up[self.Nt_up] = value
+        self.Nt_up += 1
+        self.peaks_up = self._peaks_buf_up[: self.Nt_up]
+
+    def _add_peak_down(self, value):
+        """
+        Append a lower peak in amortized O(1) time (see _add_peak_up)
+        """
+        if self.Nt_down == self._peaks_buf_down.size:
+            self._peaks_buf_down = np.resize(self._peaks_buf_down, 2 * self._peaks_buf_down.size)
+        self._peaks_buf_down[self.Nt_down] = value
+        self.Nt_down += 1
+        self.peaks_down = self._peaks_buf_down[: self.Nt_down]
+
     def fit(self, init_data, data):
         """
         Import data to biSPOT object
@@ -606,32 +759,29 @@ class biSPOT:
                     data for the run (list, np.array or pd.series)
 
         """
-        if isinstance(data, list):
-            self.data = np.array(data)
-        elif isinstance(data, np.ndarray):
-            self.data = data
-        elif isinstance(data, pd.Series):
-            self.data = data.values
-        else:
-            print("This data format (%s) is not supported" % type(data))
-            return
-
-        if isinstance(init_data, list):
-            self.init_data = np.array(init_data)
-        elif isinstance(init_data, np.ndarray):
-            self.init_data = init_data
-        elif isinstance(init_data, pd.Series):
-            self.init_data = init_data.values
-        elif isinstance(init_data, int):
-            self.init_data = self.data[:init_data]
-            self.data = self.data[init_data:]
-        elif isinstance(init_data, float) & (init_data < 1) & (init_data > 0):
-            r = int(init_data * data.size)
-            self.init_data = self.data[:r]
-            self.data = self.data[r:]
-        else:
-            print("The initial data cannot be set")
+        try:
+            self.data = _as_ndarray(data)
+        except TypeError as error:
+            print(error)
             return
+        if self.data.dtype != self.dtype:
+            self.data = self.data.astype(self.dtype)
+
+        try:
+            self.init_data = _as_ndarray(init_data)
+        except TypeError:
+            if isinstance(init_data, int):
+                self.init_data = self.data[:init_data]
+                self.data = self.data[init_data:]
+            elif isinstance(init_data, float) & (init_data < 1) & (init_data > 0):
+                r = int(init_data * data.size)
+                self.init_data = self.data[:r]
+                self.data = self.data[r:]
+            else:
+                print("The initial data cannot be set")
+                return
+        if self.init_data.dtype != self.dtype:
+            self.init_data = self.init_data.astype(self.dtype)
 
     def add(self, data):
         """
@@ -642,57 +792,65 @@ class biSPOT:
             data : list, numpy.array, pandas.Series
                     data to append
         """
-        if isinstance(data, list):
-            data = np.array(data)
-        elif isinstance(data, np.ndarray):
-            data = data
-        elif isinstance(data, pd.Series):
-            data = data.values
-        else:
-            print("This data format (%s) is not supported" % type(data))
+        try:
+            data = _as_ndarray(data)
+        except TypeError as error:
+            print(error)
             return
 
+        if data.dtype != self.dtype:
+            data = data.astype(self.dtype)
         self.data = np.append(self.data, data)
         return
 
-    def initialize(self, verbose=True):
+    def initialize(self, level=0.98, verbose=True):
         """
         Run the calibration (initialization) step
 
         Parameters
             ----------
+        level : float
+            (default 0.98) Probability associated with the initial threshold t
             verbose : bool
                     (default = True) If True, gives details about the batch initialization
         """
-        n_init = self.init_data.size
+        level = level - floor(level)
 
-        S = np.sort(self.init_data)  # we sort X to get the empirical quantile
-        self.init_threshold["up"] = S[int(0.98 * n_init)]  # t is fixed for the whole algorithm
-        self.init_threshold["down"] = S[int(0.02 * n_init)]  # t is fixed for the whole algorithm
+        n_init = self.init_data.size
 
-        # initial peaks
-        self.peaks["up"] = (
-            self.init_data[self.init_data > self.init_threshold["up"]] - self.init_threshold["up"]
-        )
-        self.peaks["down"] = -(
-            self.init_data[self.init_data < self.init_threshold["down"]]
-            - self.init_threshold["down"]
-        )
-        self.Nt["up"] = self.peaks["up"].size
-        self.Nt["down"] = self.peaks["down"].size
+        # both empirical quantiles are order statistics : one np.partition
+        # selection pass replaces the full sort
+        k_up = int(level * n_init)
+        k_down = int((1 - level) * n_init)
+        S = np.partition(self.init_data, [k_down, k_up])
+        self.thr_up = S[k_up]  # t is fixed for the whole algorithm
+        self.thr_down = S[k_down]  # t is fixed for the whole algorithm
+
+        # initial peaks : after the selection pass the tails of S hold
+        # exactly the observations beyond the thresholds, so the peaks are
+        # two slices instead of two more boolean scans over init_data
+        peaks_up = S[k_up + 1 :] - self.thr_up
+        peaks_down = self.thr_down - S[: k_down]
+        # ties with a threshold would yield zero peaks (and a degenerate
+        # 1/Ym Grimshaw bound) ; keep the strict-inequality semantics
+        self._set_peaks_up(peaks_up[peaks_up > 0])
+        self._set_peaks_down(peaks_down[peaks_down > 0])
         self.n = n_init
 
         if verbose:
-            print("Initial threshold : %s" % self.init_threshold)
-            print("Number of peaks : %s" % self.Nt)
+            print("Initial threshold : %s" % {"up": self.thr_up, "down": self.thr_down})
+            print("Number of peaks : %s" % {"up": self.Nt_up, "down": self.Nt_down})
             print("Grimshaw maximum log-likelihood estimation ... ", end="")
 
-        l = {"up": None, "down": None}
-        for side in ["up", "down"]:
-            g, s, l[side] = self._grimshaw(side)
-            self.extreme_quantile[side] = self._quantile(side, g, s)
-            self.gamma[side] = g
-            self.sigma[side] = s
+        self.gamma_up, self.sigma_up, l_up, self._last_zeros_up = self._grimshaw(self.peaks_up)
+        self.eq_up = self._quantile_up(self.gamma_up, self.sigma_up)
+        self._last_refit_up = self.Nt_up
+
+        self.gamma_down, self.sigma_down, l_down, self._last_zeros_down = self._grimshaw(
+            self.peaks_down
+        )
+        self.eq_down = self._quantile_down(self.gamma_down, self.sigma_down)
+        self._last_refit_down = self.Nt_down
 
         ltab = 20
         form = "\t" + "%20s" + "%20.2f" + "%20.2f"
@@ -700,187 +858,50 @@ class biSPOT:
             print("[done]")
             print("\t" + "Parameters".rjust(ltab) + "Upper".rjust(ltab) + "Lower".rjust(ltab))
             print("\t" + "-" * ltab * 3)
-            print(form % (chr(0x03B3), self.gamma["up"], self.gamma["down"]))
-            print(form % (chr(0x03C3), self.sigma["up"], self.sigma["down"]))
-            print(form % ("likelihood", l["up"], l["down"]))
-            print(
-                form
-                % ("Extreme quantile", self.extreme_quantile["up"], self.extreme_quantile["down"])
-            )
+            print(form % (chr(0x03B3), self.gamma_up, self.gamma_down))
+            print(form % (chr(0x03C3), self.sigma_up, self.sigma_down))
+            print(form % ("likelihood", l_up, l_down))
+            print(form % ("Extreme quantile", self.eq_up, self.eq_down))
             print("\t" + "-" * ltab * 3)
         return
 
-    def _rootsFinder(fun, jac, bounds, npoints, method):
+    def _refit_up(self):
         """
-        Find possible roots of a scalar function
-
-        Parameters
-        ----------
-        fun : function
-                    scalar function
-        jac : function
-            first order derivative of the function
-        bounds : tuple
-            (min,max) interval for the roots search
-        npoints : int
-            maximum number of roots to output
-        method : str
-            'regular' : regular sample of the search interval, 'random' : uniform (distribution) sample of the search interval
-
-        Returns
-        ----------
-        numpy.array
-            possible roots of the function
-        """
-        if method == "regular":
-            step = (bounds[1] - bounds[0]) / (npoints + 1)
-            X0 = np.arange(bounds[0] + step, bounds[1], step)
-        elif method == "random":
-            X0 = np.random.uniform(bounds[0], bounds[1], npoints)
-
-        def objFun(X, f, jac):
-            g = 0
-            j = np.zeros(X.shape)
-            i = 0
-            for x in X:
-                fx = f(x)
-                g = g + fx**2
-                j[i] = 2 * fx * jac(x)
-                i = i + 1
-            return g, j
-
-        opt = minimize(
-            lambda X: objFun(X, fun, jac),
-            X0,
-            method="L-BFGS-B",
-            jac=True,
-            bounds=[bounds] * len(X0),
-        )
-
-        X = opt.x
-        np.round(X, decimals=5)
-        return np.unique(X)
-
-    def _log_likelihood(Y, gamma, sigma):
+        Re-estimate the upper-tail GPD parameters if enough new peaks have
+        been observed since the last fit ; the cached estimates are reused
+        otherwise since one extra peak barely moves them
         """
-        Compute the log-likelihood for the Generalized Pareto Distribution (μ=0)
-
-        Parameters
-        ----------
-        Y : numpy.array
-                    observations
-        gamma : float
-            GPD index parameter
-        sigma : float
-            GPD scale parameter (>0)
+        if self.Nt_up - self._last_refit_up >= self.refit_every:
+            self.gamma_up, self.sigma_up, _, self._last_zeros_up = self._grimshaw(
+                self.peaks_up, warm=self._last_zeros_up
+            )
+            self._last_refit_up = self.Nt_up
+        self.eq_up = self._quantile_up(self.gamma_up, self.sigma_up)
 
-        Returns
-        ----------
-        float
-            log-likelihood of the sample Y to be drawn from a GPD(γ,σ,μ=0)
+    def _refit_down(self):
         """
-        n = Y.size
-        if gamma != 0:
-            tau = gamma / sigma
-            L = -n * log(sigma) - (1 + (1 / gamma)) * (np.log(1 + tau * Y)).sum()
-        else:
-            L = n * (1 + log(Y.mean()))
-        return L
-
-    def _grimshaw(self, side, epsilon=1e-8, n_points=10):
+        Re-estimate the lower-tail GPD parameters (see _refit_up)
         """
-        Compute the GPD parameters estimation with the Grimshaw's trick
-
-        Parameters
-        ----------
-        epsilon : float
-                    numerical parameter to perform (default : 1e-8)
-        n_points : int
-            maximum number of candidates for maximum likelihood (default : 10)
+        if self.Nt_down - self._last_refit_down >= self.refit_every:
+            self.gamma_down, self.sigma_down, _, self._last_zeros_down = self._grimshaw(
+                self.peaks_down, warm=self._last_zeros_down
+            )
+            self._last_refit_down = self.Nt_down
+        self.eq_down = self._quantile_down(self.gamma_down, self.sigma_down)
 
-        Returns
-        ----------
-        gamma_best,sigma_best,ll_best
-            gamma estimates, sigma estimates and corresponding log-likelihood
+    def _grimshaw(self, peaks, warm=None, epsilon=1e-8, n_points=10):
         """
+        Estimate the GPD parameters of one side (see _gpd.grimshaw) ;
+        the returned zeros let the caller warm-start the next call
+        """
+        return grimshaw(peaks, epsilon, n_points, warm=warm)
 
-        def u(s):
-            return 1 + np.log(s).mean()
-
-        def v(s):
-            return np.mean(1 / s)
-
-        def w(Y, t):
-            s = 1 + t * Y
-            us = u(s)
-            vs = v(s)
-            return us * vs - 1
-
-        def jac_w(Y, t):
-            s = 1 + t * Y
-            us = u(s)
-            vs = v(s)
-            jac_us = (1 / t) * (1 - vs)
-            jac_vs = (1 / t) * (-vs + np.mean(1 / s**2))
-            return us * jac_vs + vs * jac_us
-
-        Ym = self.peaks[side].min()
-        YM = self.peaks[side].max()
-        Ymean = self.peaks[side].mean()
-
-        a = -1 / YM
-        if abs(a) < 2 * epsilon:
-            epsilon = abs(a) / n_points
-
-        a = a + epsilon
-        b = 2 * (Ymean - Ym) / (Ymean * Ym)
-        c = 2 * (Ymean - Ym) / (Ym**2)
-
-        # We look for possible roots
-        left_zeros = biSPOT._rootsFinder(
-            lambda t: w(self.peaks[side], t),
-            lambda t: jac_w(self.peaks[side], t),
-            (a + epsilon, -epsilon),
-            n_points,
-            "regular",
-        )
-
-        right_zeros = biSPOT._rootsFinder(
-            lambda t: w(self.peaks[side], t),
-            lambda t: jac_w(self.peaks[side], t),
-            (b, c),
-            n_points,
-            "regular",
-        )
-
-        # all the possible roots
-        zeros = np.concatenate((left_zeros, right_zeros))
-
-        # 0 is always a solution so we initialize with it
-        gamma_best = 0
-        sigma_best = Ymean
-        ll_best = biSPOT._log_likelihood(self.peaks[side], gamma_best, sigma_best)
-
-        # we look for better candidates
-        for z in zeros:
-            gamma = u(1 + z * self.peaks[side]) - 1
-            sigma = gamma / z
-            ll = biSPOT._log_likelihood(self.peaks[side], gamma, sigma)
-            if ll > ll_best:
-                gamma_best = gamma
-                sigma_best = sigma
-                ll_best = ll
-
-        return gamma_best, sigma_best, ll_best
-
-    def _quantile(self, side, gamma, sigma):
+    def _quantile_up(self, gamma, sigma):
         """
-        Compute the quantile at level 1-q for a given side
+        Compute the upper quantile at level 1-q
 
         Parameters
         ----------
-        side : str
-            'up' or 'down'
         gamma : float
                     GPD parameter
         sigma : float
@@ -891,22 +912,25 @@ class biSPOT:
         float
             quantile at level 1-q for the GPD(γ,σ,μ=0)
         """
-        if side == "up":
-            r = self.n * self.proba / self.Nt[side]
-            if gamma != 0:
-                return self.init_threshold["up"] + (sigma / gamma) * (pow(r, -gamma) - 1)
-            else:
-                return self.init_threshold["up"] - sigma * log(r)
-        elif side == "down":
-            r = self.n * self.proba / self.Nt[side]
-            if gamma != 0:
-                return self.init_threshold["down"] - (sigma / gamma) * (pow(r, -gamma) - 1)
-            else:
-                return self.init_threshold["down"] + sigma * log(r)
+        r = self.n * self.proba / self.Nt_up
+        if gamma != 0:
+            # see SPOT._quantile : expm1 avoids the pow(r, -gamma) - 1
+            # cancellation for small gamma*log(r)
+            return self.thr_up + (sigma / gamma) * np.expm1(-gamma * log(r))
+        else:
+            return self.thr_up - sigma * log(r)
+
+    def _quantile_down(self, gamma, sigma):
+        """
+        Compute the lower quantile at level 1-q (see _quantile_up)
+        """
+        r = self.n * self.proba / self.Nt_down
+        if gamma != 0:
+            return self.thr_down - (sigma / gamma) * np.expm1(-gamma * log(r))
         else:
-            print("error : the side is not right")
+            return self.thr_down + sigma * log(r)
 
-    def run(self, with_alarm=True):
+    def run(self, with_alarm=True, progress=True):
         """
         Run biSPOT on the stream
 
@@ -916,6 +940,10 @@ class biSPOT:
 		    (default = True) If False, SPOT will adapt the threshold assuming \
             there is no abnormal values
 
+        progress : bool
+            (default = True) If False, the tqdm progress bar is disabled \
+            (its per-update bookkeeping is measurable on very long streams)
+
 
         Returns
         ----------
@@ -933,77 +961,99 @@ class biSPOT:
             )
             return {}
 
-        # list of the thresholds
-        thup = []
-        thdown = []
-        alarm = []
-        # Loop over the stream
-        for i in tqdm.tqdm(range(self.data.size), ascii=True):
+        n_stream = self.data.size
+        # record of the thresholds
+        thup = np.empty(n_stream, dtype=np.float64)
+        thdown = np.empty(n_stream, dtype=np.float64)
+        alarm = np.empty(n_stream, dtype=np.int64)
+        n_alarm = 0
+        # Loop over the stream : quiet stretches inside the initial band
+        # are skipped in one compiled _advance_bi call, the Python level
+        # only handles the samples that update the model
+        # locals for the loop : LOAD_FAST instead of LOAD_ATTR per sample,
+        # and the bar only redraws every ~0.1% of the stream
+        data = self.data
+        thr_up = self.thr_up
+        thr_down = self.thr_down
+        pbar = tqdm.tqdm(
+            total=n_stream,
+            ascii=True,
+            disable=not progress,
+            mininterval=0.5,
+            miniters=max(1, n_stream // 1000),
+        )
+        i = 0
+        while i < n_stream:
+            j = _advance_bi(
+                data,
+                thr_up,
+                thr_down,
+                self.eq_up,
+                self.eq_down,
+                i,
+                thup,
+                thdown,
+            )
+            self.n += j - i
+            pbar.update(j - i)
+            if j == n_stream:
+                break
+            i = j
+
             # If the observed value exceeds the current threshold (alarm case)
-            if self.data[i] > self.extreme_quantile["up"]:
-                # if we want to alarm, we put it in the alarm list
+            if data[i] > self.eq_up:
+                # if we want to alarm, we put it in the alarm record
                 if with_alarm:
-                    alarm.append(i)
+                    alarm[n_alarm] = i
+                    n_alarm += 1
                 # otherwise we add it in the peaks
                 else:
-                    self.peaks["up"] = np.append(
-                        self.peaks["up"], self.data[i] - self.init_threshold["up"]
-                    )
-                    self.Nt["up"] += 1
+                    self._add_peak_up(data[i] - thr_up)
                     self.n += 1
                     # and we update the thresholds
 
-                    g, s, l = self._grimshaw("up")
-                    self.extreme_quantile["up"] = self._quantile("up", g, s)
+                    self._refit_up()
 
             # case where the value exceeds the initial threshold but not the alarm ones
-            elif self.data[i] > self.init_threshold["up"]:
+            elif data[i] > thr_up:
                 # we add it in the peaks
-                self.peaks["up"] = np.append(
-                    self.peaks["up"], self.data[i] - self.init_threshold["up"]
-                )
-                self.Nt["up"] += 1
+                self._add_peak_up(data[i] - thr_up)
                 self.n += 1
                 # and we update the thresholds
 
-                g, s, l = self._grimshaw("up")
-                self.extreme_quantile["up"] = self._quantile("up", g, s)
+                self._refit_up()
 
-            elif self.data[i] < self.extreme_quantile["down"]:
-                # if we want to alarm, we put it in the alarm list
+            elif data[i] < self.eq_down:
+                # if we want to alarm, we put it in the alarm record
                 if with_alarm:
-                    alarm.append(i)
+                    alarm[n_alarm] = i
+                    n_alarm += 1
                 # otherwise we add it in the peaks
                 else:
-                    self.peaks["down"] = np.append(
-                        self.peaks["down"], -(self.data[i] - self.init_threshold["down"])
-                    )
-                    self.Nt["down"] += 1
+                    self._add_peak_down(-(data[i] - thr_down))
                     self.n += 1
                     # and we update the thresholds
 
-                    g, s, l = self._grimshaw("down")
-                    self.extreme_quantile["down"] = self._quantile("down", g, s)
+                    self._refit_down()
 
             # case where the value exceeds the initial threshold but not the alarm ones
-            elif self.data[i] < self.init_threshold["down"]:
+            elif data[i] < thr_down:
                 # we add it in the peaks
-                self.peaks["down"] = np.append(
-                    self.peaks["down"], -(self.data[i] - self.init_threshold["down"])
-                )
-                self.Nt["down"] += 1
+                self._add_peak_down(-(data[i] - thr_down))
                 self.n += 1
                 # and we update the thresholds
 
-                g, s, l = self._grimshaw("down")
-                self.extreme_quantile["down"] = self._quantile("down", g, s)
+                self._refit_down()
             else:
                 self.n += 1
 
-            thup.append(self.extreme_quantile["up"])  # thresholds record
-            thdown.append(self.extreme_quantile["down"])  # thresholds record
+            thup[i] = self.eq_up  # thresholds record
+            thdown[i] = self.eq_down  # thresholds record
+            pbar.update(1)
+            i += 1
+        pbar.close()
 
-        return {"upper_thresholds": thup, "lower_thresholds": thdown, "alarms": alarm}
+        return {"upper_thresholds": thup, "lower_thresholds": thdown, "alarms": alarm[:n_alarm]}
 
     def plot(self, run_results, with_alarm=True):
         """
@@ -1055,13 +1105,22 @@ class biSPOT:
 
 
 def backMean(X, d):
-    M = []
-    w = X[:d].sum()
-    M.append(w / d)
-    for i in range(d, len(X)):
-        w = w - X[i - d] + X[i]
-        M.append(w / d)
-    return np.array(M)
+    """
+    Moving average of X over a window of d samples, via cumulative sums :
+    one vectorized pass instead of a Python loop appending to a list
+    """
+    c = np.cumsum(X, dtype=np.float64)
+    M = np.empty(len(X) - d + 1)
+    M[0] = c[d - 1]
+    M[1:] = c[d:] - c[:-d]
+    return M / d
+
+
+# calibration results keyed on a digest of the initial batch and the
+# detector parameters : MicroCause re-runs detectors across overlapping
+# windows, where identical batches make the whole calibration redundant
+_CALIBRATION_CACHE = {}
+_CALIBRATION_CACHE_SIZE = 512
 
 
 class dSPOT:
@@ -1098,16 +1157,53 @@ class dSPOT:
         number of observed peaks
     """
 
-    def __init__(self, q, depth):
+    def __init__(self, q, depth, refit_every=16, dtype=np.float64):
         self.proba = q
+        self.dtype = np.dtype(dtype)
         self.extreme_quantile = None
         self.data = None
         self.init_data = None
         self.init_threshold = None
         self.peaks = None
+        self._peaks_buf = None
         self.n = 0
         self.Nt = 0
         self.depth = depth
+        self.gamma = None
+        self.sigma = None
+        self.refit_every = refit_every
+        self._last_refit_Nt = 0
+
+    def _refit(self):
+        """
+        Re-estimate the GPD parameters if enough new peaks have been
+        observed since the last fit ; the cached estimates are reused
+        otherwise since one extra peak barely moves them
+        """
+        if self.Nt - self._last_refit_Nt >= self.refit_every:
+            self.gamma, self.sigma, _ = self._grimshaw()
+            self._last_refit_Nt = self.Nt
+        self.extreme_quantile = self._quantile(self.gamma, self.sigma)
+
+    def _set_peaks(self, peaks):
+        """
+        Store the initial peaks in a preallocated buffer (see _add_peak)
+        """
+        self._peaks_buf = np.empty(max(1024, 2 * peaks.size), dtype=self.dtype)
+        self._peaks_buf[: peaks.size] = peaks
+        self.Nt = peaks.size
+        self.peaks = self._peaks_buf[: self.Nt]
+
+    def _add_peak(self, value):
+        """
+        Append a peak in amortized O(1) time : the buffer is grown
+        geometrically instead of reallocating on every np.append
+        """
+        if self.Nt == self._peaks_buf.size:
+            self._peaks_buf = np.resize(self._peaks_buf, 2 * self._peaks_buf.size)
+        self._peaks_buf[self.Nt] = value
+        self.Nt += 1
+        self.peaks = self._peaks_buf[: self.Nt]
 
     def __str__(self):
         s = ""
@@ -1154,32 +1250,29 @@ class dSPOT:
                     data for the run (list, np.array or pd.series)
 
         """
-        if isinstance(data, list):
-            self.data = np.array(data)
-        elif isinstance(data, np.ndarray):
-            self.data = data
-        elif isinstance(data, pd.Series):
-            self.data = data.values
-        else:
-            print("This data format (%s) is not supported" % type(data))
-            return
-
-        if isinstance(init_data, list):
-            self.init_data = np.array(init_data)
-        elif isinstance(init_data, np.ndarray):
-            self.init_data = init_data
-        elif isinstance(init_data, pd.Series):
-            self.init_data = init_data.values
-        elif isinstance(init_data, int):
-            self.init_data = self.data[:init_data]
-            self.data = self.data[init_data:]
-        elif isinstance(init_data, float) & (init_data < 1) & (init_data > 0):
-            r = int(init_data * data.size)
-            self.init_data = self.data[:r]
-            self.data = self.data[r:]
-        else:
-            print("The initial data cannot be set")
+        try:
+            self.data = _as_ndarray(data)
+        except TypeError as error:
+            print(error)
             return
+        if self.data.dtype != self.dtype:
+            self.data = self.data.astype(self.dtype)
+
+        try:
+            self.init_data = _as_ndarray(init_data)
+        except TypeError:
+            if isinstance(init_data, int):
+                self.init_data = self.data[:init_data]
+                self.data = self.data[init_data:]
+            elif isinstance(init_data, float) & (init_data < 1) & (init_data > 0):
+                r = int(init_data * data.size)
+                self.init_data = self.data[:r]
+                self.data = self.data[r:]
+            else:
+                print("The initial data cannot be set")
+                return
+        if self.init_data.dtype != self.dtype:
+            self.init_data = self.init_data.astype(self.dtype)
 
     def add(self, data):
         """
@@ -1190,39 +1283,59 @@ class dSPOT:
             data : list, numpy.array, pandas.Series
                     data to append
         """
-        if isinstance(data, list):
-            data = np.array(data)
-        elif isinstance(data, np.ndarray):
-            data = data
-        elif isinstance(data, pd.Series):
-            data = data.values
-        else:
-            print("This data format (%s) is not supported" % type(data))
+        try:
+            data = _as_ndarray(data)
+        except TypeError as error:
+            print(error)
             return
 
+        if data.dtype != self.dtype:
+            data = data.astype(self.dtype)
         self.data = np.append(self.data, data)
         return
 
-    def initialize(self, verbose=True):
+    def initialize(self, level=0.98, verbose=True):
         """
         Run the calibration (initialization) step
 
         Parameters
             ----------
+        level : float
+            (default 0.98) Probability associated with the initial threshold t
             verbose : bool
                     (default = True) If True, gives details about the batch initialization
         """
-        n_init = self.init_data.size - self.depth
-
-        M = backMean(self.init_data, self.depth)
-        T = self.init_data[self.depth :] - M[:-1]  # new variable
+        level = level - floor(level)
 
-        S = np.sort(T)  # we sort X to get the empirical quantile
-        self.init_threshold = S[int(0.98 * n_init)]  # t is fixed for the whole algorithm
+        n_init = self.init_data.size - self.depth
 
-        # initial peaks
-        self.peaks = T[T > self.init_threshold] - self.init_threshold
-        self.Nt = self.peaks.size
+        key = (
+            hashlib.sha1(np.ascontiguousarray(self.init_data).tobytes()).hexdigest(),
+            self.init_data.size,
+            self.depth,
+            level,
+        )
+        cached = _CALIBRATION_CACHE.get(key)
+        if cached is not None:
+            # the digest is cheap next to the selection pass and the
+            # Grimshaw fit it saves on a repeated batch
+            self.init_threshold, peaks, g, s, l = cached
+            self._set_peaks(peaks)
+        else:
+            M = backMean(self.init_data, self.depth)
+            T = self.init_data[self.depth :] - M[:-1]  # new variable
+
+            # the empirical quantile is an order statistic : one np.partition
+            # selection pass replaces the full sort
+            k = int(level * n_init)
+            S = np.partition(T, k)
+            self.init_threshold = S[k]  # t is fixed for the whole algorithm
+
+            # initial peaks : after the selection pass the tail of S holds
+            # exactly the observations beyond the threshold ; ties with the
+            # threshold are dropped to keep the strict-inequality semantics
+            peaks = S[k + 1 :] - self.init_threshold
+            self._set_peaks(peaks[peaks > 0])
         self.n = n_init
 
         if verbose:
@@ -1230,7 +1343,15 @@ class dSPOT:
             print("Number of peaks : %s" % self.Nt)
             print("Grimshaw maximum log-likelihood estimation ... ", end="")
 
-        g, s, l = self._grimshaw()
+        if cached is None:
+            g, s, l = self._grimshaw()
+            if len(_CALIBRATION_CACHE) >= _CALIBRATION_CACHE_SIZE:
+                # drop the oldest entry (insertion order) to bound memory
+                _CALIBRATION_CACHE.pop(next(iter(_CALIBRATION_CACHE)))
+            _CALIBRATION_CACHE[key] = (self.init_threshold, self.peaks.copy(), g, s, l)
+        self.gamma = g
+        self.sigma = s
+        self._last_refit_Nt = self.Nt
         self.extreme_quantile = self._quantile(g, s)
 
         if verbose:
@@ -1242,87 +1363,13 @@ class dSPOT:
 
         return
 
-    def _rootsFinder(fun, jac, bounds, npoints, method):
-        """
-        Find possible roots of a scalar function
-
-        Parameters
-        ----------
-        fun : function
-                    scalar function
-        jac : function
-            first order derivative of the function
-        bounds : tuple
-            (min,max) interval for the roots search
-        npoints : int
-            maximum number of roots to output
-        method : str
-            'regular' : regular sample of the search interval, 'random' : uniform (distribution) sample of the search interval
-
-        Returns
-        ----------
-        numpy.array
-            possible roots of the function
-        """
-        if method == "regular":
-            step = (bounds[1] - bounds[0]) / (npoints + 1)
-            X0 = np.arange(bounds[0] + step, bounds[1], step)
-        elif method == "random":
-            X0 = np.random.uniform(bounds[0], bounds[1], npoints)
-
-        def objFun(X, f, jac):
-            g = 0
-            j = np.zeros(X.shape)
-            i = 0
-            for x in X:
-                fx = f(x)
-                g = g + fx**2
-                j[i] = 2 * fx * jac(x)
-                i = i + 1
-            return g, j
-
-        opt = minimize(
-            lambda X: objFun(X, fun, jac),
-            X0,
-            method="L-BFGS-B",
-            jac=True,
-            bounds=[bounds] * len(X0),
-        )
-
-        X = opt.x
-        np.round(X, decimals=5)
-        return np.unique(X)
-
-    def _log_likelihood(Y, gamma, sigma):
-        """
-        Compute the log-likelihood for the Generalized Pareto Distribution (μ=0)
-
-        Parameters
-        ----------
-        Y : numpy.array
-                    observations
-        gamma : float
-            GPD index parameter
-        sigma : float
-            GPD scale parameter (>0)
-
-        Returns
-        ----------
-        float
-            log-likelihood of the sample Y to be drawn from a GPD(γ,σ,μ=0)
-        """
-        n = Y.size
-        if gamma != 0:
-            tau = gamma / sigma
-            L = -n * log(sigma) - (1 + (1 / gamma)) * (np.log(1 + tau * Y)).sum()
-        else:
-            L = n * (1 + log(Y.mean()))
-        return L
-
     def _grimshaw(self, epsilon=1e-8, n_points=10):
         """
         Compute the GPD parameters estimation with the Grimshaw's trick
 
+        The estimation itself lives in RCAEval.e2e._gpd and is shared by
+        every detector of the family
+
         Parameters
         ----------
         epsilon : float
@@ -1335,72 +1382,8 @@ class dSPOT:
         gamma_best,sigma_best,ll_best
             gamma estimates, sigma estimates and corresponding log-likelihood
         """
-
-        def u(s):
-            return 1 + np.log(s).mean()
-
-        def v(s):
-            return np.mean(1 / s)
-
-        def w(Y, t):
-            s = 1 + t * Y
-            us = u(s)
-            vs = v(s)
-            return us * vs - 1
-
-        def jac_w(Y, t):
-            s = 1 + t * Y
-            us = u(s)
-            vs = v(s)
-            jac_us = (1 / t) * (1 - vs)
-            jac_vs = (1 / t) * (-vs + np.mean(1 / s**2))
-            return us * jac_vs + vs * jac_us
-
-        Ym = self.peaks.min()
-        YM = self.peaks.max()
-        Ymean = self.peaks.mean()
-
-        a = -1 / YM
-        if abs(a) < 2 * epsilon:
-            epsilon = abs(a) / n_points
-
-        a = a + epsilon
-        b = 2 * (Ymean - Ym) / (Ymean * Ym)
-        c = 2 * (Ymean - Ym) / (Ym**2)
-
-        # We look for possible roots
-        left_zeros = SPOT._rootsFinder(
-            lambda t: w(self.peaks, t),
-            lambda t: jac_w(self.peaks, t),
-            (a + epsilon, -epsilon),
-            n_points,
-            "random",
-        )
-
-        # right_zeros = SPOT._rootsFinder( lambda t: w(self.peaks, t), lambda t: jac_w(self.peaks, t), (b, c), n_points, "regular")
-        right_zeros = SPOT._rootsFinder(
-            lambda t: w(self.peaks, t), lambda t: jac_w(self.peaks, t), (b, c), n_points, "random"
-        )
-
-        # all the possible roots
-        zeros = np.concatenate((left_zeros, right_zeros))
-
-        # 0 is always a solution so we initialize with it
-        gamma_best = 0
-        sigma_best = Ymean
-        ll_best = SPOT._log_likelihood(self.peaks, gamma_best, sigma_best)
-
-        # we look for better candidates
-        for z in zeros:
-            gamma = u(1 + z * self.peaks) - 1
-            sigma = gamma / z
-            ll = dSPOT._log_likelihood(self.peaks, gamma, sigma)
-            if ll > ll_best:
-                gamma_best = gamma
-                sigma_best = sigma
-                ll_best = ll
-
-        return gamma_best, sigma_best, ll_best
+        gamma, sigma, ll, _ = grimshaw(self.peaks, epsilon=epsilon, n_points=n_points)
+        return gamma, sigma, ll
 
     def _quantile(self, gamma, sigma):
         """
@@ -1420,11 +1403,13 @@ class dSPOT:
         """
         r = self.n * self.proba / self.Nt
         if gamma != 0:
-            return self.init_threshold + (sigma / gamma) * (pow(r, -gamma) - 1)
+            # see SPOT._quantile : expm1 avoids the pow(r, -gamma) - 1
+            # cancellation for small gamma*log(r)
+            return self.init_threshold + (sigma / gamma) * np.expm1(-gamma * log(r))
         else:
             return self.init_threshold - sigma * log(r)
 
-    def run(self, with_alarm=True):
+    def run(self, with_alarm=True, progress=True):
         """
         Run biSPOT on the stream
 
@@ -1434,6 +1419,10 @@ class dSPOT:
 		    (default = True) If False, SPOT will adapt the threshold assuming \
             there is no abnormal values
 
+        progress : bool
+            (default = True) If False, the tqdm progress bar is disabled \
+            (its per-update bookkeeping is measurable on very long streams)
+
 
         Returns
         ----------
@@ -1451,49 +1440,78 @@ class dSPOT:
             )
             return {}
 
-        # actual normal window
-        W = self.init_data[-self.depth :]
+        # actual normal window, kept as a ring buffer with a running sum :
+        # replacing the oldest sample and updating the sum is O(1) where
+        # np.append(W[1:], x) re-copied the whole window every iteration
+        depth = self.depth
+        W = np.array(self.init_data[-depth:], dtype=np.float64)
+        Wsum = W.sum()
+        head = 0  # position of the oldest sample in the ring
+
+        # record of the thresholds and of the alarm indexes
+        data = self.data
+        n_stream = data.size
+        th = np.empty(n_stream, dtype=np.float64)
+        alarm = np.empty(n_stream, dtype=np.int64)
+        n_alarm = 0
+        # Loop over the stream : the quiet stretches (below the initial
+        # threshold relative to the moving average) are consumed by one
+        # compiled _advance_drift call carrying the window state, the
+        # Python level only handles the samples that update the model
+        pbar = tqdm.tqdm(
+            total=n_stream,
+            ascii=True,
+            disable=not progress,
+            mininterval=0.5,
+            miniters=max(1, n_stream // 1000),
+        )
+        i = 0
+        while i < n_stream:
+            j, head, Wsum = _advance_drift(
+                data, W, head, Wsum, self.init_threshold, self.extreme_quantile, i, th
+            )
+            self.n += j - i
+            pbar.update(j - i)
+            if j == n_stream:
+                break
+            i = j
 
-        # list of the thresholds
-        th = []
-        alarm = []
-        # Loop over the stream
-        for i in tqdm.tqdm(range(self.data.size), ascii=True):
-            Mi = W.mean()
+            Mi = Wsum / depth
             # If the observed value exceeds the current threshold (alarm case)
-            if (self.data[i] - Mi) > self.extreme_quantile:
-                # if we want to alarm, we put it in the alarm list
+            if (data[i] - Mi) > self.extreme_quantile:
+                # if we want to alarm, we put it in the alarm record
                 if with_alarm:
-                    alarm.append(i)
+                    alarm[n_alarm] = i
+                    n_alarm += 1
                 # otherwise we add it in the peaks
                 else:
-                    self.peaks = np.append(self.peaks, self.data[i] - Mi - self.init_threshold)
-                    self.Nt += 1
+                    self._add_peak(data[i] - Mi - self.init_threshold)
                     self.n += 1
                     # and we update the thresholds
 
-                    g, s, l = self._grimshaw()
-                    self.extreme_quantile = self._quantile(g, s)  # + Mi
-                    W = np.append(W[1:], self.data[i])
+                    self._refit()  # + Mi
+                    Wsum += data[i] - W[head]
+                    W[head] = data[i]
+                    head = (head + 1) % depth
 
             # case where the value exceeds the initial threshold but not the alarm ones
-            elif (self.data[i] - Mi) > self.init_threshold:
+            else:
                 # we add it in the peaks
-                self.peaks = np.append(self.peaks, self.data[i] - Mi - self.init_threshold)
-                self.Nt += 1
+                self._add_peak(data[i] - Mi - self.init_threshold)
                 self.n += 1
                 # and we update the thresholds
 
-                g, s, l = self._grimshaw()
-                self.extreme_quantile = self._quantile(g, s)  # + Mi
-                W = np.append(W[1:], self.data[i])
-            else:
-                self.n += 1
-                W = np.append(W[1:], self.data[i])
+                self._refit()  # + Mi
+                Wsum += data[i] - W[head]
+                W[head] = data[i]
+                head = (head + 1) % depth
 
-            th.append(self.extreme_quantile + Mi)  # thresholds record
+            th[i] = self.extreme_quantile + Mi  # thresholds record
+            pbar.update(1)
+            i += 1
+        pbar.close()
 
-        return {"thresholds": th, "alarms": alarm}
+        return {"thresholds": th, "alarms": alarm[:n_alarm]}
 
     def plot(self, run_results, with_alarm=True):
         """
@@ -1561,8 +1579,8 @@ class bidSPOT:
     depth : int
         Number of observations to compute the moving average
 
-    extreme_quantile : float
-        current threshold (bound between normal and abnormal events)
+    eq_up, eq_down : float
+        current thresholds (bounds between normal and abnormal events)
 
     data : numpy.array
         stream
@@ -1570,34 +1588,103 @@ class bidSPOT:
     init_data : numpy.array
         initial batch of observations (for the calibration/initialization step)
 
-    init_threshold : float
-        initial threshold computed during the calibration step
+    thr_up, thr_down : float
+        initial thresholds computed during the calibration step
 
-    peaks : numpy.array
-        array of peaks (excesses above the initial threshold)
+    peaks_up, peaks_down : numpy.array
+        arrays of peaks (excesses beyond the initial thresholds)
 
     n : int
         number of observed values
 
-    Nt : int
-        number of observed peaks
+    Nt_up, Nt_down : int
+        number of observed peaks per side
     """
 
-    def __init__(self, q=1e-4, depth=10):
+    def __init__(self, q=1e-4, depth=10, refit_every=16, dtype=np.float64):
         self.proba = q
+        self.dtype = np.dtype(dtype)
         self.data = None
         self.init_data = None
         self.n = 0
         self.depth = depth
+        self.refit_every = refit_every
+
+        self.eq_up = None
+        self.eq_down = None
+        self.thr_up = None
+        self.thr_down = None
+        self.peaks_up = None
+        self.peaks_down = None
+        self._peaks_buf_up = None
+        self._peaks_buf_down = None
+        self.gamma_up = None
+        self.gamma_down = None
+        self.sigma_up = None
+        self.sigma_down = None
+        self.Nt_up = 0
+        self.Nt_down = 0
+        self._last_refit_up = 0
+        self._last_refit_down = 0
+
+    def _refit_up(self):
+        """
+        Re-estimate the upper-tail GPD parameters if enough new peaks have
+        been observed since the last fit ; the cached estimates are reused
+        otherwise since one extra peak barely moves them
+        """
+        if self.Nt_up - self._last_refit_up >= self.refit_every:
+            self.gamma_up, self.sigma_up, _ = self._grimshaw(self.peaks_up)
+            self._last_refit_up = self.Nt_up
+        self.eq_up = self._quantile_up(self.gamma_up, self.sigma_up)
+
+    def _refit_down(self):
+        """
+        Re-estimate the lower-tail GPD parameters (see _refit_up)
+        """
+        if self.Nt_down - self._last_refit_down >= self.refit_every:
+            self.gamma_down, self.sigma_down, _ = self._grimshaw(self.peaks_down)
+            self._last_refit_down = self.Nt_down
+        self.eq_down = self._quantile_down(self.gamma_down, self.sigma_down)
+
+    def _set_peaks_up(self, peaks):
+        """
+        Store the initial upper peaks in a preallocated buffer (see _add_peak_up)
+        """
+        self._peaks_buf_up = np.empty(max(1024, 2 * peaks.size), dtype=self.dtype)
+        self._peaks_buf_up[: peaks.size] = peaks
+        self.Nt_up = peaks.size
+        self.peaks_up = self._peaks_buf_up[: peaks.size]
+
+    def _set_peaks_down(self, peaks):
+        """
+        Store the initial lower peaks in a preallocated buffer (see _add_peak_down)
+        """
+        self._peaks_buf_down = np.empty(max(1024, 2 * peaks.size), dtype=self.dtype)
+        self._peaks_buf_down[: peaks.size] = peaks
+        self.Nt_down = peaks.size
+        self.peaks_down = self._peaks_buf_down[: peaks.size]
 
-        nonedict = {"up": None, "down": None}
+    def _add_peak_up(self, value):
+        """
+        Append an upper peak in amortized O(1) time : the buffer is grown
+        geometrically instead of reallocating on every np.append
+        """
+        if self.Nt_up == self._peaks_buf_up.size:
+            self._peaks_buf_up = np.resize(self._peaks_buf_up, 2 * self._peaks_buf_up.size)
+        self._peaks_buf_up[self.Nt_up] = value
+        self.Nt_up += 1
+        self.peaks_up = self._peaks_buf_up[: self.Nt_up]
 
-        self.extreme_quantile = dict.copy(nonedict)
-        self.init_threshold = dict.copy(nonedict)
-        self.peaks = dict.copy(nonedict)
-        self.gamma = dict.copy(nonedict)
-        self.sigma = dict.copy(nonedict)
-        self.Nt = {"up": 0, "down": 0}
+    def _add_peak_down(self, value):
+        """
+        Append a lower peak in amortized O(1) time (see _add_peak_up)
+        """
+        if self.Nt_down == self._peaks_buf_down.size:
+            self._peaks_buf_down = np.resize(self._peaks_buf_down, 2 * self._peaks_buf_down.size)
+        self._peaks_buf_down[self.Nt_down] = value
+        self.Nt_down += 1
+        self.peaks_down = self._peaks_buf_down[: self.Nt_down]
 
     def __str__(self):
         s = ""
@@ -1615,7 +1702,7 @@ class bidSPOT:
             s += "Algorithm initialized : No\n"
         else:
             s += "Algorithm initialized : Yes\n"
-            s += "\t initial threshold : %s\n" % self.init_threshold
+            s += "\t initial threshold : %s\n" % {"up": self.thr_up, "down": self.thr_down}
 
             r = self.n - self.init_data.size
             if r > 0:
@@ -1626,9 +1713,9 @@ class bidSPOT:
                     100 * len(self.alarm) / self.n,
                 )
             else:
-                s += "\t number of peaks  : %s\n" % self.Nt
-                s += "\t upper extreme quantile : %s\n" % self.extreme_quantile["up"]
-                s += "\t lower extreme quantile : %s\n" % self.extreme_quantile["down"]
+                s += "\t number of peaks  : %s\n" % {"up": self.Nt_up, "down": self.Nt_down}
+                s += "\t upper extreme quantile : %s\n" % self.eq_up
+                s += "\t lower extreme quantile : %s\n" % self.eq_down
                 s += "Algorithm run : No\n"
         return s
 
@@ -1645,32 +1732,29 @@ class bidSPOT:
                     data for the run (list, np.array or pd.series)
 
         """
-        if isinstance(data, list):
-            self.data = np.array(data)
-        elif isinstance(data, np.ndarray):
-            self.data = data
-        elif isinstance(data, pd.Series):
-            self.data = data.values
-        else:
-            print("This data format (%s) is not supported" % type(data))
-            return
-
-        if isinstance(init_data, list):
-            self.init_data = np.array(init_data)
-        elif isinstance(init_data, np.ndarray):
-            self.init_data = init_data
-        elif isinstance(init_data, pd.Series):
-            self.init_data = init_data.values
-        elif isinstance(init_data, int):
-            self.init_data = self.data[:init_data]
-            self.data = self.data[init_data:]
-        elif isinstance(init_data, float) & (init_data < 1) & (init_data > 0):
-            r = int(init_data * data.size)
-            self.init_data = self.data[:r]
-            self.data = self.data[r:]
-        else:
-            print("The initial data cannot be set")
+        try:
+            self.data = _as_ndarray(data)
+        except TypeError as error:
+            print(error)
             return
+        if self.data.dtype != self.dtype:
+            self.data = self.data.astype(self.dtype)
+
+        try:
+            self.init_data = _as_ndarray(init_data)
+        except TypeError:
+            if isinstance(init_data, int):
+                self.init_data = self.data[:init_data]
+                self.data = self.data[init_data:]
+            elif isinstance(init_data, float) & (init_data < 1) & (init_data > 0):
+                r = int(init_data * data.size)
+                self.init_data = self.data[:r]
+                self.data = self.data[r:]
+            else:
+                print("The initial data cannot be set")
+                return
+        if self.init_data.dtype != self.dtype:
+            self.init_data = self.init_data.astype(self.dtype)
 
     def add(self, data):
         """
@@ -1681,55 +1765,64 @@ class bidSPOT:
             data : list, numpy.array, pandas.Series
                     data to append
         """
-        if isinstance(data, list):
-            data = np.array(data)
-        elif isinstance(data, np.ndarray):
-            data = data
-        elif isinstance(data, pd.Series):
-            data = data.values
-        else:
-            print("This data format (%s) is not supported" % type(data))
+        try:
+            data = _as_ndarray(data)
+        except TypeError as error:
+            print(error)
             return
 
+        if data.dtype != self.dtype:
+            data = data.astype(self.dtype)
         self.data = np.append(self.data, data)
         return
 
-    def initialize(self, verbose=True):
+    def initialize(self, level=0.98, verbose=True):
         """
         Run the calibration (initialization) step
 
         Parameters
             ----------
+        level : float
+            (default 0.98) Probability associated with the initial threshold t
             verbose : bool
                     (default = True) If True, gives details about the batch initialization
         """
+        level = level - floor(level)
+
         n_init = self.init_data.size - self.depth
 
         M = backMean(self.init_data, self.depth)
         T = self.init_data[self.depth :] - M[:-1]  # new variable
 
-        S = np.sort(T)  # we sort T to get the empirical quantile
-        self.init_threshold["up"] = S[int(0.98 * n_init)]  # t is fixed for the whole algorithm
-        self.init_threshold["down"] = S[int(0.02 * n_init)]  # t is fixed for the whole algorithm
-
-        # initial peaks
-        self.peaks["up"] = T[T > self.init_threshold["up"]] - self.init_threshold["up"]
-        self.peaks["down"] = -(T[T < self.init_threshold["down"]] - self.init_threshold["down"])
-        self.Nt["up"] = self.peaks["up"].size
-        self.Nt["down"] = self.peaks["down"].size
+        # both empirical quantiles are order statistics : one np.partition
+        # selection pass replaces the full sort
+        k_up = int(level * n_init)
+        k_down = int((1 - level) * n_init)
+        S = np.partition(T, [k_down, k_up])
+        self.thr_up = S[k_up]  # t is fixed for the whole algorithm
+        self.thr_down = S[k_down]  # t is fixed for the whole algorithm
+
+        # initial peaks : after the selection pass the tails of S hold
+        # exactly the observations beyond the thresholds ; ties with a
+        # threshold are dropped to keep the strict-inequality semantics
+        peaks_up = S[k_up + 1 :] - self.thr_up
+        peaks_down = self.thr_down - S[:k_down]
+        self._set_peaks_up(peaks_up[peaks_up > 0])
+        self._set_peaks_down(peaks_down[peaks_down > 0])
         self.n = n_init
 
         if verbose:
-            print("Initial threshold : %s" % self.init_threshold)
-            print("Number of peaks : %s" % self.Nt)
+            print("Initial threshold : %s" % {"up": self.thr_up, "down": self.thr_down})
+            print("Number of peaks : %s" % {"up": self.Nt_up, "down": self.Nt_down})
             print("Grimshaw maximum log-likelihood estimation ... ", end="")
 
-        l = {"up": None, "down": None}
-        for side in ["up", "down"]:
-            g, s, l[side] = self._grimshaw(side)
-            self.extreme_quantile[side] = self._quantile(side, g, s)
-            self.gamma[side] = g
-            self.sigma[side] = s
+        self.gamma_up, self.sigma_up, l_up = self._grimshaw(self.peaks_up)
+        self.eq_up = self._quantile_up(self.gamma_up, self.sigma_up)
+        self._last_refit_up = self.Nt_up
+
+        self.gamma_down, self.sigma_down, l_down = self._grimshaw(self.peaks_down)
+        self.eq_down = self._quantile_down(self.gamma_down, self.sigma_down)
+        self._last_refit_down = self.Nt_down
 
         ltab = 20
         form = "\t" + "%20s" + "%20.2f" + "%20.2f"
@@ -1737,187 +1830,43 @@ class bidSPOT:
             print("[done]")
             print("\t" + "Parameters".rjust(ltab) + "Upper".rjust(ltab) + "Lower".rjust(ltab))
             print("\t" + "-" * ltab * 3)
-            print(form % (chr(0x03B3), self.gamma["up"], self.gamma["down"]))
-            print(form % (chr(0x03C3), self.sigma["up"], self.sigma["down"]))
-            print(form % ("likelihood", l["up"], l["down"]))
-            print(
-                form
-                % ("Extreme quantile", self.extreme_quantile["up"], self.extreme_quantile["down"])
-            )
+            print(form % (chr(0x03B3), self.gamma_up, self.gamma_down))
+            print(form % (chr(0x03C3), self.sigma_up, self.sigma_down))
+            print(form % ("likelihood", l_up, l_down))
+            print(form % ("Extreme quantile", self.eq_up, self.eq_down))
             print("\t" + "-" * ltab * 3)
         return
 
-    def _rootsFinder(fun, jac, bounds, npoints, method):
-        """
-        Find possible roots of a scalar function
-
-        Parameters
-        ----------
-        fun : function
-                    scalar function
-        jac : function
-            first order derivative of the function
-        bounds : tuple
-            (min,max) interval for the roots search
-        npoints : int
-            maximum number of roots to output
-        method : str
-            'regular' : regular sample of the search interval, 'random' : uniform (distribution) sample of the search interval
-
-        Returns
-        ----------
-        numpy.array
-            possible roots of the function
-        """
-        if method == "regular":
-            step = (bounds[1] - bounds[0]) / (npoints + 1)
-            X0 = np.arange(bounds[0] + step, bounds[1], step)
-        elif method == "random":
-            X0 = np.random.uniform(bounds[0], bounds[1], npoints)
-
-        def objFun(X, f, jac):
-            g = 0
-            j = np.zeros(X.shape)
-            i = 0
-            for x in X:
-                fx = f(x)
-                g = g + fx**2
-                j[i] = 2 * fx * jac(x)
-                i = i + 1
-            return g, j
-
-        opt = minimize(
-            lambda X: objFun(X, fun, jac),
-            X0,
-            method="L-BFGS-B",
-            jac=True,
-            bounds=[bounds] * len(X0),
-        )
-
-        X = opt.x
-        np.round(X, decimals=5)
-        return np.unique(X)
-
-    def _log_likelihood(Y, gamma, sigma):
-        """
-        Compute the log-likelihood for the Generalized Pareto Distribution (μ=0)
-
-        Parameters
-        ----------
-        Y : numpy.array
-                    observations
-        gamma : float
-            GPD index parameter
-        sigma : float
-            GPD scale parameter (>0)
-
-        Returns
-        ----------
-        float
-            log-likelihood of the sample Y to be drawn from a GPD(γ,σ,μ=0)
-        """
-        n = Y.size
-        if gamma != 0:
-            tau = gamma / sigma
-            L = -n * log(sigma) - (1 + (1 / gamma)) * (np.log(1 + tau * Y)).sum()
-        else:
-            L = n * (1 + log(Y.mean()))
-        return L
-
-    def _grimshaw(self, side, epsilon=1e-8, n_points=8):
+    def _grimshaw(self, peaks, epsilon=1e-8, n_points=8):
         """
         Compute the GPD parameters estimation with the Grimshaw's trick
 
+        The estimation itself lives in RCAEval.e2e._gpd and is shared by
+        every detector of the family
+
         Parameters
         ----------
+        peaks : numpy.array
+            peaks of the fitted side
         epsilon : float
                     numerical parameter to perform (default : 1e-8)
         n_points : int
-            maximum number of candidates for maximum likelihood (default : 10)
+            maximum number of candidates for maximum likelihood (default : 8)
 
         Returns
         ----------
         gamma_best,sigma_best,ll_best
             gamma estimates, sigma estimates and corresponding log-likelihood
         """
+        gamma, sigma, ll, _ = grimshaw(peaks, epsilon=epsilon, n_points=n_points)
+        return gamma, sigma, ll
 
-        def u(s):
-            return 1 + np.log(s).mean()
-
-        def v(s):
-            return np.mean(1 / s)
-
-        def w(Y, t):
-            s = 1 + t * Y
-            us = u(s)
-            vs = v(s)
-            return us * vs - 1
-
-        def jac_w(Y, t):
-            s = 1 + t * Y
-            us = u(s)
-            vs = v(s)
-            jac_us = (1 / t) * (1 - vs)
-            jac_vs = (1 / t) * (-vs + np.mean(1 / s**2))
-            return us * jac_vs + vs * jac_us
-
-        Ym = self.peaks[side].min()
-        YM = self.peaks[side].max()
-        Ymean = self.peaks[side].mean()
-
-        a = -1 / YM
-        if abs(a) < 2 * epsilon:
-            epsilon = abs(a) / n_points
-
-        a = a + epsilon
-        b = 2 * (Ymean - Ym) / (Ymean * Ym)
-        c = 2 * (Ymean - Ym) / (Ym**2)
-
-        # We look for possible roots
-        left_zeros = bidSPOT._rootsFinder(
-            lambda t: w(self.peaks[side], t),
-            lambda t: jac_w(self.peaks[side], t),
-            (a + epsilon, -epsilon),
-            n_points,
-            "regular",
-        )
-
-        right_zeros = bidSPOT._rootsFinder(
-            lambda t: w(self.peaks[side], t),
-            lambda t: jac_w(self.peaks[side], t),
-            (b, c),
-            n_points,
-            "regular",
-        )
-
-        # all the possible roots
-        zeros = np.concatenate((left_zeros, right_zeros))
-
-        # 0 is always a solution so we initialize with it
-        gamma_best = 0
-        sigma_best = Ymean
-        ll_best = bidSPOT._log_likelihood(self.peaks[side], gamma_best, sigma_best)
-
-        # we look for better candidates
-        for z in zeros:
-            gamma = u(1 + z * self.peaks[side]) - 1
-            sigma = gamma / z
-            ll = bidSPOT._log_likelihood(self.peaks[side], gamma, sigma)
-            if ll > ll_best:
-                gamma_best = gamma
-                sigma_best = sigma
-                ll_best = ll
-
-        return gamma_best, sigma_best, ll_best
-
-    def _quantile(self, side, gamma, sigma):
+    def _quantile_up(self, gamma, sigma):
         """
-        Compute the quantile at level 1-q for a given side
+        Compute the upper quantile at level 1-q
 
         Parameters
         ----------
-        side : str
-            'up' or 'down'
         gamma : float
                     GPD parameter
         sigma : float
@@ -1926,24 +1875,27 @@ class bidSPOT:
         Returns
         ----------
         float
-            quantile at level 1-q for the GPD(γ,σ,μ=0)
+            upper quantile at level 1-q for the GPD(γ,σ,μ=0)
         """
-        if side == "up":
-            r = self.n * self.proba / self.Nt[side]
-            if gamma != 0:
-                return self.init_threshold["up"] + (sigma / gamma) * (pow(r, -gamma) - 1)
-            else:
-                return self.init_threshold["up"] - sigma * log(r)
-        elif side == "down":
-            r = self.n * self.proba / self.Nt[side]
-            if gamma != 0:
-                return self.init_threshold["down"] - (sigma / gamma) * (pow(r, -gamma) - 1)
-            else:
-                return self.init_threshold["down"] + sigma * log(r)
+        r = self.n * self.proba / self.Nt_up
+        if gamma != 0:
+            # see SPOT._quantile : expm1 avoids the pow(r, -gamma) - 1
+            # cancellation for small gamma*log(r)
+            return self.thr_up + (sigma / gamma) * np.expm1(-gamma * log(r))
+        else:
+            return self.thr_up - sigma * log(r)
+
+    def _quantile_down(self, gamma, sigma):
+        """
+        Compute the lower quantile at level 1-q (see _quantile_up)
+        """
+        r = self.n * self.proba / self.Nt_down
+        if gamma != 0:
+            return self.thr_down - (sigma / gamma) * np.expm1(-gamma * log(r))
         else:
-            print("error : the side is not right")
+            return self.thr_down + sigma * log(r)
 
-    def run(self, with_alarm=True, plot=True):
+    def run(self, with_alarm=True, plot=True, progress=True):
         """
         Run biDSPOT on the stream
 
@@ -1953,6 +1905,9 @@ class bidSPOT:
 		    (default = True) If False, SPOT will adapt the threshold assuming \
             there is no abnormal values
 
+        progress : bool
+            (default = True) If False, the tqdm progress bar is disabled
+
 
         Returns
         ----------
@@ -1970,82 +1925,59 @@ class bidSPOT:
             )
             return {}
 
-        # actual normal window
-        W = self.init_data[-self.depth :]
-
-        # list of the thresholds
-        thup = []
-        thdown = []
-        alarm = []
+        # actual normal window, kept as a ring buffer with a running sum
+        # (see dSPOT.run)
+        depth = self.depth
+        W = np.array(self.init_data[-depth:], dtype=np.float64)
+        Wsum = W.sum()
+        head = 0  # position of the oldest sample in the ring
+
+        # record of the thresholds and of the alarm indexes
+        n_stream = self.data.size
+        thup = np.empty(n_stream, dtype=np.float64)
+        thdown = np.empty(n_stream, dtype=np.float64)
+        alarm = np.empty(n_stream, dtype=np.int64)
+        n_alarm = 0
+        # local alias : LOAD_FAST instead of LOAD_ATTR per sample, and the
+        # bar only redraws every ~0.1% of the stream
+        data = self.data
         # Loop over the stream
-        for i in tqdm.tqdm(range(self.data.size), ascii=True):
-            Mi = W.mean()
-            Ni = self.data[i] - Mi
-            # If the observed value exceeds the current threshold (alarm case)
-            if Ni > self.extreme_quantile["up"]:
-                # if we want to alarm, we put it in the alarm list
-                if with_alarm:
-                    alarm.append(i)
-                # otherwise we add it in the peaks
-                else:
-                    self.peaks["up"] = np.append(self.peaks["up"], Ni - self.init_threshold["up"])
-                    self.Nt["up"] += 1
-                    self.n += 1
-                    # and we update the thresholds
-
-                    g, s, l = self._grimshaw("up")
-                    self.extreme_quantile["up"] = self._quantile("up", g, s)
-                    W = np.append(W[1:], self.data[i])
-
-            # case where the value exceeds the initial threshold but not the alarm ones
-            elif Ni > self.init_threshold["up"]:
-                # we add it in the peaks
-                self.peaks["up"] = np.append(self.peaks["up"], Ni - self.init_threshold["up"])
-                self.Nt["up"] += 1
-                self.n += 1
-                # and we update the thresholds
-                g, s, l = self._grimshaw("up")
-                self.extreme_quantile["up"] = self._quantile("up", g, s)
-                W = np.append(W[1:], self.data[i])
-
-            elif Ni < self.extreme_quantile["down"]:
-                # if we want to alarm, we put it in the alarm list
-                if with_alarm:
-                    alarm.append(i)
-                # otherwise we add it in the peaks
-                else:
-                    self.peaks["down"] = np.append(
-                        self.peaks["down"], -(Ni - self.init_threshold["down"])
-                    )
-                    self.Nt["down"] += 1
-                    self.n += 1
-                    # and we update the thresholds
-
-                    g, s, l = self._grimshaw("down")
-                    self.extreme_quantile["down"] = self._quantile("down", g, s)
-                    W = np.append(W[1:], self.data[i])
-
-            # case where the value exceeds the initial threshold but not the alarm ones
-            elif Ni < self.init_threshold["down"]:
-                # we add it in the peaks
-                self.peaks["down"] = np.append(
-                    self.peaks["down"], -(Ni - self.init_threshold["down"])
-                )
-                self.Nt["down"] += 1
-                self.n += 1
-                # and we update the thresholds
-
-                g, s, l = self._grimshaw("down")
-                self.extreme_quantile["down"] = self._quantile("down", g, s)
-                W = np.append(W[1:], self.data[i])
+        for i in tqdm.tqdm(
+            range(n_stream),
+            ascii=True,
+            disable=not progress,
+            mininterval=0.5,
+            miniters=max(1, n_stream // 1000),
+        ):
+            Mi = Wsum / depth
+            xi = data[i]
+            Ni = xi - Mi
+            # classify the sample once : the five former branches repeated
+            # the same comparisons and the same window update, so the
+            # chain fuses into alarm / peak / quiet with one shared tail
+            up_alarm = Ni > self.eq_up
+            down_alarm = Ni < self.eq_down
+            if with_alarm and (up_alarm or down_alarm):
+                # alarms do not enter the moving window
+                alarm[n_alarm] = i
+                n_alarm += 1
             else:
                 self.n += 1
-                W = np.append(W[1:], self.data[i])
-
-            thup.append(self.extreme_quantile["up"] + Mi)  # upper thresholds record
-            thdown.append(self.extreme_quantile["down"] + Mi)  # lower thresholds record
-
-        return {"upper_thresholds": thup, "lower_thresholds": thdown, "alarms": alarm}
+                if up_alarm or Ni > self.thr_up:
+                    # we add it in the peaks and we update the thresholds
+                    self._add_peak_up(Ni - self.thr_up)
+                    self._refit_up()
+                elif down_alarm or Ni < self.thr_down:
+                    self._add_peak_down(-(Ni - self.thr_down))
+                    self._refit_down()
+                Wsum += xi - W[head]
+                W[head] = xi
+                head = (head + 1) % depth
+
+            thup[i] = self.eq_up + Mi  # upper thresholds record
+            thdown[i] = self.eq_down + Mi  # lower thresholds record
+
+        return {"upper_thresholds": thup, "lower_thresholds": thdown, "alarms": alarm[:n_alarm]}
 
     def plot(self, run_results, with_alarm=True):
         """
@@ -2092,56 +2024,79 @@ class bidSPOT:
         return fig
 
 
-def run_SPOT(data, q=1e-3, d=30, n_init=None):
+def _run_SPOT_series(init_data, data, q, d, verbose=True):
+    # q: risk parameter
+    # d: depth parameter
+    s = dSPOT(q, d)  # DSPOT object
+    s.fit(init_data, data)  # data import
+    s.initialize(verbose=verbose)  # initialization step
+    return s.run(progress=verbose)  # run
+
+
+def run_SPOT(data, q=1e-3, d=30, n_init=None, n_jobs=1):
     node_names = list(range(1, data.shape[1] + 1))
 
-    result_dict = {}
     if n_init is None:
         n_init = int(0.2 * len(data))
+
+    if n_jobs != 1:
+        # each service stream is an independent detector : score them in
+        # parallel workers (quiet, their progress bars would interleave)
+        results = Parallel(n_jobs=n_jobs)(
+            delayed(_run_SPOT_series)(
+                data[:n_init, svc_id], data[n_init:, svc_id], q, d, verbose=False
+            )
+            for svc_id in range(len(node_names))
+        )
+        return dict(enumerate(results))
+
+    result_dict = {}
     for svc_id in range(len(node_names)):
         print("{:-^40}".format("svc_id: {}".format(svc_id)))
         init_data = data[:n_init, svc_id]  # initial batch
         _data = data[n_init:, svc_id]  # stream
-        # q: risk parameter
-        # d: depth parameter
-        s = dSPOT(q, d)  # DSPOT object
-        s.fit(init_data, _data)  # data import
-        s.initialize()  # initialization step
-        results = s.run()  # run
+        result_dict[svc_id] = _run_SPOT_series(init_data, _data, q, d)
         #     s.plot(results) 	 	# plot
-        result_dict[svc_id] = results
     return result_dict
 
 
 def get_Q_matrix(g, rho=0.2):
-    corr = np.corrcoef(np.array(data).T)
-    for i in range(corr.shape[0]):
-        corr[i, i] = 0.0
-    corr = np.abs(corr)
+    # asarray skips the copy when data is already an ndarray, and the
+    # diagonal is cleared in one C call instead of a Python loop
+    corr = np.abs(np.corrcoef(np.asarray(data).T))
+    np.fill_diagonal(corr, 0.0)
+
+    # materialize the edge list once : edge membership becomes an O(1)
+    # set probe instead of an O(|E|) scan per edge, and the deprecated
+    # nx.adj_matrix sparse/matrix detour becomes a plain ndarray
+    edges = list(g.edges())
+    edge_set = set(edges)
 
     Q = np.zeros([len(node_names), len(node_names)])
-    for e in g.edges():
-        Q[e[0], e[1]] = corr[frontend[0] - 1, e[1]]
-        backward_e = (e[1], e[0])
-        if backward_e not in g.edges():
-            Q[e[1], e[0]] = rho * corr[frontend[0] - 1, e[0]]
-
-    adj = nx.adj_matrix(g).todense()
-    for i in range(len(node_names)):
-        P_pc_max = None
-        res_l = np.array([corr[frontend[0] - 1, k] for k in adj[:, i]])
-        if corr[frontend[0] - 1, i] > np.max(res_l):
-            Q[i, i] = corr[frontend[0] - 1, i] - np.max(res_l)
-        else:
-            Q[i, i] = 0
-    l = []
-    for i in np.sum(Q, axis=1):
-        if i > 0:
-            l.append(1.0 / i)
-        else:
-            l.append(0.0)
-    l = np.diag(l)
-    Q = np.dot(l, Q)
+    c = corr[frontend[0] - 1]
+    if edges:
+        # forward and backward cells are disjoint (backward only fills
+        # pairs that are not edges themselves), so two fancy-indexed
+        # assignments replace the per-edge Python loop
+        E = np.array(edges)
+        src, dst = E[:, 0], E[:, 1]
+        Q[src, dst] = c[dst]
+        back = np.array([(e[1], e[0]) not in edge_set for e in edges])
+        Q[dst[back], src[back]] = rho * c[src[back]]
+
+    # diagonal : keep the historical index-by-adjacency-value semantics
+    # (corr looked up at the 0/1 entries of the column), batched as one
+    # take plus a column-wise max
+    adj = nx.to_numpy_array(g)
+    res = c[adj.astype(np.intp)]
+    res_max = res.max(axis=0)
+    np.fill_diagonal(Q, np.where(c > res_max, c - res_max, 0.0))
+
+    # row-normalize without building a diagonal matrix
+    row = Q.sum(axis=1)
+    with np.errstate(divide="ignore"):
+        scale = np.where(row > 0, 1.0 / row, 0.0)
+    Q = Q * scale[:, None]
     return Q
 
 
@@ -2155,24 +2110,32 @@ def randomwalk(
 ):
     n = P.shape[0]
     score = np.zeros([n])
-    current = start_node - 1
+    # per-row cumulative transition distributions, computed once : each
+    # step is then one uniform draw plus a binary search instead of the
+    # O(n) scan (and range(n) allocation) np.random.choice pays per draw
+    C = np.cumsum(P, axis=1)
+    row_total = C[:, -1]
+    # absorbing rows are known up front ; the per-step test is then a
+    # plain bool lookup
+    dead = row_total == 0
+    rng = np.random.default_rng()
     for epoch in range(epochs):
         current = start_node - 1
         if print_trace:
             print("\n{:2d}".format(current + 1), end="->")
+        U = rng.random(walk_step)
         for step in range(walk_step):
-            if np.sum(P[current]) == 0:
+            if dead[current]:
                 break
             else:
-                next_node = np.random.choice(range(n), p=P[current])
+                next_node = np.searchsorted(
+                    C[current], U[step] * row_total[current], side="right"
+                )
                 if print_trace:
                     print("{:2d}".format(current + 1), end="->")
                 score[next_node] += 1
                 current = next_node
-    label = [i for i in range(n)]
-    score_list = list(zip(label, score))
-    score_list.sort(key=lambda x: x[1], reverse=True)
-    return score_list
+    return score
 
 
 def microcause(
@@ -2181,7 +2144,9 @@ def microcause(
     data = preprocess(
         data=data, dataset=dataset, dk_select_useful=kwargs.get("dk_select_useful", False)
     )
-    np_data = data.to_numpy().astype(float)
+    # zero-copy when preprocess already yields float64 ; to_numpy only
+    # materializes a new block for non-float frames
+    np_data = np.ascontiguousarray(data.to_numpy(dtype=np.float64, copy=False))
     node_names = data.columns.to_list()
 
     frontend = [node_names.index(sli) + 1]
@@ -2189,79 +2154,98 @@ def microcause(
     # try:
     # SPOT_res = run_SPOT(np_data, q=1e-3, d=50)
 
-    def get_Q_matrix_part_corr(g, rho=0.2):
-        # df = pd.DataFrame(np_data, columns=node_names)
-        df = data
+    def get_Q_matrix_part_corr(adj, edges, rho=0.2):
+        # the same (x, y, conditioning set) triple recurs across the
+        # forward, backward and diagonal loops below ; each unique partial
+        # correlation is computed once
+        _pc_cache = {}
+
+        # one orthonormal residualization basis (intercept included) per
+        # unique conditioning set ; every (x, y) pair sharing the set then
+        # costs two matvecs and a dot instead of a per-call regression
+        _basis_cache = {}
+
+        def _residual_basis(cond):
+            key = frozenset(cond)
+            Qb = _basis_cache.get(key)
+            if Qb is None:
+                Z = np.empty((np_data.shape[0], len(cond) + 1))
+                Z[:, 0] = 1.0
+                if cond:
+                    Z[:, 1:] = np_data[:, sorted(cond)]
+                Qb = np.linalg.qr(Z)[0]
+                _basis_cache[key] = Qb
+            return Qb
 
         def get_part_corr(x, y):
             cond = get_confounders(y)
-            if x in cond:
-                cond.remove(x)
-            if y in cond:
-                cond.remove(y)
-            ret = partial_corr(
-                data=df,
-                x=df.columns[x],
-                y=df.columns[y],
-                covar=[df.columns[_] for _ in cond],
-                method="pearson",
-            )
-            # For a valid transition probability, use absolute correlation values.
-            return abs(float(ret.r))
-
-        # Calculate the parent nodes set.
-        pa_set = {}
-        for e in g.edges():
+            cond.discard(x)
+            cond.discard(y)
+            key = (x, y, frozenset(cond))
+            r = _pc_cache.get(key)
+            if r is None:
+                Qb = _residual_basis(cond)
+                rx = np_data[:, x] - Qb @ (Qb.T @ np_data[:, x])
+                ry = np_data[:, y] - Qb @ (Qb.T @ np_data[:, y])
+                denom = np.sqrt((rx @ rx) * (ry @ ry))
+                # For a valid transition probability, use absolute correlation values.
+                r = abs(rx @ ry) / denom if denom > 0 else 0.0
+                _pc_cache[key] = r
+            return r
+
+        # edge membership is an O(1) set probe instead of an O(|E|) scan
+        edge_set = frozenset(edges)
+
+        # Calculate the parent nodes set in a single pass ; the
+        # defaultdict hands nodes without parents an empty set on demand
+        pa_set = defaultdict(set)
+        for u, v in edges:
             # Skip self links.
-            if e[0] == e[1]:
-                continue
-            if e[1] not in pa_set:
-                pa_set[e[1]] = set([e[0]])
-            else:
-                pa_set[e[1]].add(e[0])
-        # Set an empty set for the nodes without parent nodes.
-        for n in g.nodes():
-            if n not in pa_set:
-                pa_set[n] = set([])
+            if u != v:
+                pa_set[v].add(u)
+
+        # the frontend index is fixed for the whole build
+        f = frontend[0] - 1
 
         def get_confounders(j: int):
-            ret = pa_set[frontend[0] - 1].difference([j])
+            ret = pa_set[f].difference([j])
             ret = ret.union(pa_set[j])
             return ret
 
         Q = np.zeros([len(node_names), len(node_names)])
-        for e in g.edges():
+        for e in edges:
             # Do not add self links.
             if e[0] == e[1]:
                 continue
             # e[0] --> e[1]: cause --> result
             # Forward step.
             # Note for partial correlation, the two variables cannot be the same.
-            if frontend[0] - 1 != e[0]:
-                Q[e[1], e[0]] = get_part_corr(frontend[0] - 1, e[0])
+            if f != e[0]:
+                Q[e[1], e[0]] = get_part_corr(f, e[0])
             # Backward step
             backward_e = (e[1], e[0])
             # Note for partial correlation, the two variables cannot be the same.
-            if backward_e not in g.edges() and frontend[0] - 1 != e[1]:
-                Q[e[0], e[1]] = rho * get_part_corr(frontend[0] - 1, e[1])
+            if backward_e not in edge_set and f != e[1]:
+                Q[e[0], e[1]] = rho * get_part_corr(f, e[1])
 
-        adj = nx.adj_matrix(g).todense()
+        # flat predecessor index arrays, extracted once per column
+        preds = [np.flatnonzero(adj[:, i]) for i in range(len(node_names))]
         for i in range(len(node_names)):
             # Calculate P_pc^max
             P_pc_max = []
             # (k, i) in edges.
-            for k in adj[:, i].nonzero()[0]:
+            for k in preds[i]:
                 # Note for partial correlation, the two variables cannot be the same.
-                if frontend[0] - 1 != k:
-                    P_pc_max.append(get_part_corr(frontend[0] - 1, k))
+                if f != k:
+                    P_pc_max.append(get_part_corr(f, k))
             if len(P_pc_max) > 0:
                 P_pc_max = np.max(P_pc_max)
             else:
                 P_pc_max = 0
 
             # Note for partial correlation, the two variables cannot be the same.
-            if frontend[0] - 1 != i:
-                q_ii = get_part_corr(frontend[0] - 1, i)
+            if f != i:
+                q_ii = get_part_corr(f, i)
                 if q_ii > P_pc_max:
                     Q[i, i] = q_ii - P_pc_max
                 else:
@@ -2278,18 +2262,21 @@ def microcause(
         return Q
 
     def get_eta(SPOT_res, n_init):
-        eta = np.zeros([len(node_names)])
-        ab_timepoint = [0 for i in range(len(node_names))]
-        for svc_id in range(len(node_names)):
-            mask = np_data[n_init:, svc_id] > np.array(SPOT_res[svc_id]["thresholds"])
-            ratio = np.abs(
-                np_data[n_init:, svc_id] - np.array(SPOT_res[svc_id]["thresholds"])
-            ) / np.array(SPOT_res[svc_id]["thresholds"])
-            if mask.nonzero()[0].shape[0] > 0:
-                eta[svc_id] = np.max(ratio[mask.nonzero()[0]])
-                ab_timepoint[svc_id] = np.min(mask.nonzero()[0])
-            else:
-                eta[svc_id] = 0
+        # batch across services : the per-service thresholds stack into a
+        # (stream, services) matrix, so the mask, the exceedance ratio and
+        # the first abnormal timepoint come out of one broadcast pass
+        # instead of one Python iteration (and three conversions) per service
+        T = np.stack(
+            [np.asarray(SPOT_res[svc_id]["thresholds"]) for svc_id in range(len(node_names))],
+            axis=1,
+        )
+        X = np_data[n_init:]
+        mask = X > T
+        ratio = np.abs(X - T) / T
+        hit = mask.any(axis=0)
+        eta = np.where(hit, np.where(mask, ratio, -np.inf).max(axis=0), 0.0)
+        # argmax over the boolean mask is the first True per column
+        ab_timepoint = list(np.where(hit, mask.argmax(axis=0), 0))
         return eta, ab_timepoint
 
     # eta, ab_timepoint = get_eta(SPOT_res, int(0.5 * len(np_data)))
@@ -2311,54 +2298,41 @@ def microcause(
             alpha_level=alpha_level,
             include_lagzero_links=False,
         )
-        g = nx.DiGraph()
-        for i in range(len(node_names)):
-            g.add_node(i)
+        # build the dense adjacency and the edge list straight from the
+        # link dict : they are all the Q builder and the caller consume,
+        # so the DiGraph (and its later sparse-matrix roundtrip) goes away
+        A = np.zeros((len(node_names), len(node_names)), dtype=np.int8)
+        edges = []
         for n, links in pcmci_links["link_dict"].items():
             for l in links:
-                g.add_edge(n, l[0])
-        return g
-
-    g = get_links(pcmci, pcmci_res, alpha_level=0.001)
-    Q = get_Q_matrix_part_corr(g, rho=0.2)
-
-    vis_list = randomwalk(Q, 1000, frontend[0], teleportation_prob=0, walk_step=1000)
-
-    def get_gamma(score_list, eta, lambda_param=0.8):
-        gamma = [0 for _ in range(len(node_names))]
-        max_vis_time = np.max([i[1] for i in score_list])
-        #     max_vis_time = 1.0
-        max_eta = np.max(eta)
-        for n, vis in score_list:
-            gamma[n] = lambda_param * vis / max_vis_time + (1 - lambda_param) * eta[n] / max_eta
-        return gamma
-
-    gamma = get_gamma(vis_list, eta, lambda_param=0.5)
-
-    score_list = sorted(
-        zip([(i + 1) for i in range(len(node_names))], gamma), key=lambda x: x[1], reverse=True
-    )
-
-    """
-    [(4, 0.5456346812449508),
-     (3, 0.522603027996977),
-      (8, 0.5),
-       (9, 0.042577533064681955),
-        (2, 0.03943466310564701),
-         (6, 0.03290640165083645),
-          (1, 0.0247683398383279),
-           (7, 0.007963883394528627),
-            (10, 0.0027164158244277915),
-             (5, 0.0)]
-    """
-    ranks = []
-    for r in score_list:  # (10, 1032.)
-        r = r[0]  # 10
-        # node_names[idx - 1]
-        ranks.append(node_names[r - 1])
+                # several lags of the same pair collapse into one edge
+                if A[n, l[0]] == 0:
+                    A[n, l[0]] = 1
+                    edges.append((n, l[0]))
+        return A, edges
+
+    A, edges = get_links(pcmci, pcmci_res, alpha_level=0.001)
+    Q = get_Q_matrix_part_corr(A, edges, rho=0.2)
+
+    score = randomwalk(Q, 1000, frontend[0], teleportation_prob=0, walk_step=1000)
+
+    # combine visit counts and eta in one vector pass instead of the
+    # former per-node loop over a sorted (node, score) list
+    lambda_param = 0.5
+    max_vis = score.max()
+    if max_vis == 0:
+        max_vis = 1.0
+    max_eta = eta.max()
+    if max_eta == 0:
+        max_eta = 1.0
+    gamma = lambda_param * score / max_vis + (1 - lambda_param) * eta / max_eta
+
+    # stable sort keeps the historical tie order (ascending node index)
+    order = np.argsort(-gamma, kind="stable")
+    ranks = [node_names[i] for i in order]
 
     return {
-        "adj": nx.adjacency_matrix(g).todense(),
+        "adj": A,
         "node_names": node_names,
         "ranks": ranks,
     }
@@ -0,0 +1,49 @@
+"""Tests for the shared Grimshaw GPD estimation helpers."""
+import numpy as np
+
+from RCAEval.e2e._gpd import grimshaw, roots_finder
+
+
+def _down_side_peaks(seed):
+    """Bounded-tail excesses : below the 2% quantile of a gamma(2,1) batch."""
+    rng = np.random.RandomState(seed)
+    x = rng.gamma(2.0, 1.0, 1000)
+    thr = np.sort(x)[int(0.02 * x.size)]
+    return -(x[x < thr] - thr)
+
+
+def test_grimshaw_negative_gamma_parity():
+    """Bounded (negative-gamma) tails must not collapse to the gamma=0 fit.
+
+    The Grimshaw w function plunges and re-crosses zero within a thin
+    boundary layer right of -1/YM on such samples ; a coarse sign-change
+    scan misses that root and the fit silently degrades to gamma=0.
+    Reference log-likelihoods come from the original L-BFGS-B estimator
+    on the same seeds.
+    """
+    for seed, ll_ref in [(0, 30.343), (7, 32.666), (10, 34.619)]:
+        gamma, sigma, ll, _ = grimshaw(_down_side_peaks(seed))
+        assert gamma < -0.3
+        assert ll >= ll_ref - 0.05
+
+
+def test_grimshaw_rootless_interval_keeps_boundary_candidate():
+    """When w has no root, the |w| boundary minimum still yields a fit.
+
+    The original minimizer returned boundary minimizers of w**2, whose
+    near-zero negative gamma scores far above the gamma=0 baseline on
+    these samples ; seed 1 has no sign change on the left interval.
+    """
+    gamma, sigma, ll, _ = grimshaw(_down_side_peaks(1))
+    assert gamma < 0
+    assert ll >= 36.0
+
+
+def test_roots_finder_double_crossing_in_one_coarse_cell():
+    """A sign dip narrower than the coarse grid spacing must be found."""
+    # roots at 0.049 and 0.051 sit inside one cell of an 11-point grid
+    roots = roots_finder(
+        lambda t: (t - 0.049) * (t - 0.051), None, (0.0, 1.0), 10, "regular"
+    )
+    assert np.any(np.abs(roots - 0.049) < 1e-4)
+    assert np.any(np.abs(roots - 0.051) < 1e-4)